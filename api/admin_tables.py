@@ -0,0 +1,152 @@
+MAX_PER_PAGE = 500
+DEFAULT_PER_PAGE = 50
+FILTERS = ("grade", "stream", "status", "slot")
+HIDDEN_COLUMNS = {"パスワード"}
+
+
+def split_cell(value):
+    return [part.strip() for part in str(value or "").split(",") if part.strip()]
+
+
+class TableView:
+    # Read-only, indexed copy of one admin table. Each filter facet maps a
+    # value to the sorted positions of the rows carrying it; sort orders are
+    # computed on first use and kept for the lifetime of the view.
+    # name_postings: facet -> {value: names} taken from a storage index
+    # instead of being derived from the rows.
+    def __init__(self, rows, columns, name_column: str, facets: dict, sort_keys=None, name_postings=None):
+        self.rows = rows
+        self.columns = columns
+        self.name_column = name_column
+        self.sort_keys = sort_keys or {}
+        self.postings = {facet: {} for facet in facets}
+        name_postings = name_postings or {}
+        derived = {facet: values_of for facet, values_of in facets.items() if facet not in name_postings}
+        for pos, row in enumerate(rows):
+            for facet, values_of in derived.items():
+                postings = self.postings[facet]
+                for value in set(values_of(row)):
+                    postings.setdefault(value, []).append(pos)
+        if name_postings:
+            position = {str(row.get(name_column, "")): pos for pos, row in enumerate(rows)}
+            for facet, by_value in name_postings.items():
+                self.postings[facet] = {
+                    value: sorted(position[name] for name in names if name in position)
+                    for value, names in by_value.items()
+                }
+        self._orders = {}
+
+    def facet_counts(self) -> dict:
+        return {facet: {value: len(positions) for value, positions in postings.items()} for facet, postings in self.postings.items()}
+
+    def order(self, column: str, descending: bool):
+        key = (column, descending)
+        if key not in self._orders:
+            sort_key = self.sort_keys.get(column, lambda row: str(row.get(column, "")))
+            self._orders[key] = sorted(range(len(self.rows)), key=lambda pos: sort_key(self.rows[pos]), reverse=descending)
+        return self._orders[key]
+
+    def select(self, filters: dict, text: str = ""):
+        # Intersects the postings of every active filter, smallest first.
+        lists = []
+        for facet, value in filters.items():
+            if value in (None, "") or facet not in self.postings:
+                continue
+            lists.append(self.postings[facet].get(value, []))
+        if lists:
+            lists.sort(key=len)
+            selected = set(lists[0])
+            for positions in lists[1:]:
+                selected.intersection_update(positions)
+        else:
+            selected = None
+        if text:
+            candidates = range(len(self.rows)) if selected is None else selected
+            selected = {pos for pos in candidates if text in str(self.rows[pos].get(self.name_column, ""))}
+        return selected
+
+    def page(self, filters: dict, text: str = "", sort=None, descending=False, page: int = 1, per_page: int = DEFAULT_PER_PAGE):
+        selected = self.select(filters, text)
+        if sort in self.columns:
+            positions = self.order(sort, descending)
+        else:
+            positions = range(len(self.rows) - 1, -1, -1) if descending else range(len(self.rows))
+        if selected is not None:
+            positions = [pos for pos in positions if pos in selected]
+        total = len(positions)
+        per_page = max(1, min(MAX_PER_PAGE, per_page))
+        start = (max(1, page) - 1) * per_page
+        return {
+            "total": total,
+            "page": max(1, page),
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page,
+            "columns": self.columns,
+            "rows": [self.rows[pos] for pos in positions[start:start + per_page]],
+        }
+
+
+def build_views(students, mentors, results, slot_sort_key, grade_order, slot_postings=None) -> dict:
+    # students / mentors / results: Tables as loaded from storage.
+    # slot_postings: sheet name -> {slot: names} where storage indexes slots.
+    slot_postings = slot_postings or {}
+    matched = {}
+    mentor_load = {}
+    for row in results.rows:
+        if row.get("ステータス") == "決定":
+            matched[row.get("生徒氏名")] = row
+            mentor_load[row.get("決定メンター")] = mentor_load.get(row.get("決定メンター"), 0) + 1
+
+    grade_rank = {grade: i for i, grade in enumerate(grade_order)}
+
+    def grade_key(column):
+        return lambda row: (grade_rank.get(row.get(column), len(grade_rank)), str(row.get(column, "")))
+
+    def status_of(matched_now):
+        return ["matched" if matched_now else "unmatched"]
+
+    student_columns = [column for column in students.columns if column not in HIDDEN_COLUMNS]
+    mentor_columns = [column for column in mentors.columns if column not in HIDDEN_COLUMNS] + ["担当数"]
+    mentor_rows = [
+        {**{column: row.get(column, "") for column in mentor_columns[:-1]}, "担当数": mentor_load.get(row.get("メンター氏名"), 0)}
+        for row in mentors.rows
+    ]
+    return {
+        "students": TableView(
+            [{column: row.get(column, "") for column in student_columns} for row in students.rows],
+            student_columns,
+            "生徒氏名",
+            {
+                "grade": lambda row: [row.get("学年", "")],
+                "stream": lambda row: [row.get("文理", "")],
+                "status": lambda row: status_of(row.get("生徒氏名") in matched),
+                "slot": lambda row: split_cell(row.get("可能日時")),
+            },
+            {"学年": grade_key("学年")},
+            {"slot": slot_postings["students"]} if slot_postings.get("students") is not None else None,
+        ),
+        "mentors": TableView(
+            mentor_rows,
+            mentor_columns,
+            "メンター氏名",
+            {
+                "stream": lambda row: split_cell(row.get("文理")),
+                "status": lambda row: status_of(row["担当数"] > 0),
+                "slot": lambda row: split_cell(row.get("可能日時")),
+            },
+            {"担当数": lambda row: row["担当数"]},
+            {"slot": slot_postings["mentors"]} if slot_postings.get("mentors") is not None else None,
+        ),
+        "results": TableView(
+            list(results.rows),
+            list(results.columns),
+            "生徒氏名",
+            {
+                "grade": lambda row: [row.get("学年", "")],
+                "stream": lambda row: [row.get("生徒文理", "")],
+                "status": lambda row: status_of(row.get("ステータス") == "決定"),
+                "slot": lambda row: [row.get("決定日時", "")] if row.get("決定日時") else [],
+            },
+            {"学年": grade_key("学年"), "決定日時": lambda row: slot_sort_key(row.get("決定日時"))},
+        ),
+    }
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from api.startup import lazy_import
+
+AUTH_CACHE_PATH = os.environ.get("SHEETS_AUTH_CACHE", "/tmp/scheduling_app_auth.json")
+TOKEN_MARGIN = 300
+
+
+def fingerprint_of(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    # JSON file under /tmp that outlives a single invocation on a warm
+    # container: the OAuth access token and its expiry, the spreadsheet
+    # properties and the worksheet metadata. Everything is keyed by a
+    # fingerprint of the credentials and spreadsheet URL, so rotating either
+    # one discards the file contents.
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict) or state.get("fingerprint") != self.fingerprint:
+            return {}
+        return state
+
+    def update(self, **fields):
+        with self._lock:
+            state = self.load()
+            state.update(fields, fingerprint=self.fingerprint)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+    def token(self):
+        state = self.load()
+        if state.get("token") and state.get("expiry", 0) - TOKEN_MARGIN > time.time():
+            return state["token"], state["expiry"]
+        return None
+
+
+def service_account_credentials(info: dict, scopes, cache: AuthCache):
+    service_account = lazy_import("google.oauth2.service_account")
+
+    class PersistedCredentials(service_account.Credentials):
+        def refresh(self, request):
+            super().refresh(request)
+            expiry = self.expiry.replace(tzinfo=timezone.utc).timestamp() if self.expiry else 0
+            cache.update(token=self.token, expiry=expiry)
+
+    creds = PersistedCredentials.from_service_account_info(info, scopes=scopes)
+    cached = cache.token()
+    if cached is not None:
+        token, expiry = cached
+        creds.token = token
+        creds.expiry = datetime.fromtimestamp(expiry, timezone.utc).replace(tzinfo=None)
+    return creds
+
+
+def open_spreadsheet(client, spreadsheet_url: str, cache: AuthCache):
+    gspread = lazy_import("gspread")
+
+    class CachedSpreadsheet(gspread.Spreadsheet):
+        # Skips the metadata fetch gspread does on open. The first
+        # worksheets() call is served from the persisted snapshot when there
+        # is one; later calls (after a lookup miss) fetch and re-persist.
+        def __init__(self, http_client, properties: dict, sheets):
+            self.client = http_client
+            self._properties = properties
+            self._sheets = sheets
+
+        def worksheets(self, exclude_hidden: bool = False):
+            sheets, self._sheets = self._sheets, None
+            if sheets is None:
+                metadata = self.fetch_sheet_metadata()
+                self._properties.update(metadata["properties"])
+                sheets = [sheet["properties"] for sheet in metadata["sheets"]]
+                cache.update(spreadsheet=self._properties, worksheets=sheets)
+            worksheets = [gspread.Worksheet(self, props, self.id, self.client) for props in sheets]
+            if exclude_hidden:
+                worksheets = [ws for ws in worksheets if not ws.isSheetHidden]
+            return worksheets
+
+    state = cache.load()
+    if state.get("spreadsheet"):
+        return CachedSpreadsheet(client.http_client, state["spreadsheet"], state.get("worksheets"))
+    spreadsheet_id = gspread.utils.extract_id_from_url(spreadsheet_url)
+    return CachedSpreadsheet(client.http_client, {"id": spreadsheet_id}, None)
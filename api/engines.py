@@ -0,0 +1,11 @@
+from api.flow import match_min_cost_flow
+from api.greedy import match_greedy
+from api.vector import match_vectorized
+
+# Every engine takes (catalog, student_masks, student_streams, mentor_free,
+# mentor_streams) and returns one (mentor index, slot id) or None per student.
+ENGINES = {
+    "greedy": match_greedy,
+    "flow": match_min_cost_flow,
+    "vector": match_vectorized,
+}
@@ -0,0 +1,222 @@
+import heapq
+from collections import deque
+
+from api.slots import ALL_STREAMS, iter_bits
+
+STREAM_PENALTY = 100
+LOAD_COST = 10
+SPREAD_COST = 1
+
+INF = float("inf")
+
+
+class MinCostFlow:
+    def __init__(self, n: int = 0):
+        self.n = n
+        self.head = [[] for _ in range(n)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_node(self) -> int:
+        self.head.append([])
+        self.n += 1
+        return self.n - 1
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int) -> int:
+        e = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.head[u].append(e)
+        self.head[v].append(e + 1)
+        return e
+
+    def flow(self, s: int, t: int):
+        # Primal-dual: Dijkstra on reduced costs, then a Dinic blocking flow
+        # over the zero-reduced-cost arcs, so each distinct path length costs
+        # one Dijkstra instead of one per unit of flow.
+        n, head, to, cap, cost = self.n, self.head, self.to, self.cap, self.cost
+        h = [0] * n
+        total_flow = total_cost = 0
+        while True:
+            dist = [INF] * n
+            dist[s] = 0
+            heap = [(0, s)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                hu = h[u]
+                for e in head[u]:
+                    if cap[e]:
+                        v = to[e]
+                        nd = d + cost[e] + hu - h[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            heapq.heappush(heap, (nd, v))
+            if dist[t] == INF:
+                break
+            for v in range(n):
+                if dist[v] != INF:
+                    h[v] += dist[v]
+
+            pushed = self._blocking_flow(s, t, h)
+            total_flow += pushed
+            total_cost += pushed * (h[t] - h[s])
+        return total_flow, total_cost
+
+    def _blocking_flow(self, s: int, t: int, h) -> int:
+        head, to, cap, cost = self.head, self.to, self.cap, self.cost
+        pushed = 0
+        while True:
+            level = [-1] * self.n
+            level[s] = 0
+            queue = deque([s])
+            while queue:
+                u = queue.popleft()
+                hu = h[u]
+                for e in head[u]:
+                    if cap[e]:
+                        v = to[e]
+                        if level[v] < 0 and cost[e] + hu - h[v] == 0:
+                            level[v] = level[u] + 1
+                            queue.append(v)
+            if level[t] < 0:
+                return pushed
+
+            it = [0] * self.n
+            while True:
+                # iterative DFS for one augmenting path; dead ends are pruned
+                # by clearing their level so later searches skip them
+                path = []
+                u = s
+                while u != t:
+                    edges = head[u]
+                    end = len(edges)
+                    i = it[u]
+                    next_level = level[u] + 1
+                    hu = h[u]
+                    while i < end:
+                        e = edges[i]
+                        if cap[e]:
+                            v = to[e]
+                            if level[v] == next_level and cost[e] + hu == h[v]:
+                                break
+                        i += 1
+                    it[u] = i
+                    if i == end:
+                        if not path:
+                            break
+                        level[u] = -1
+                        u = to[path.pop() ^ 1]
+                        it[u] += 1
+                        continue
+                    path.append(edges[i])
+                    u = to[edges[i]]
+                if u != t:
+                    break
+                bottleneck = min(cap[e] for e in path)
+                for e in path:
+                    cap[e] -= bottleneck
+                    cap[e ^ 1] += bottleneck
+                pushed += bottleneck
+
+
+def match_min_cost_flow(catalog, student_masks, student_streams, mentor_free, mentor_streams, seed=None):
+    # Linear approximation of the greedy preferences: a stream mismatch costs
+    # STREAM_PENALTY, every assignment beyond a mentor's first costs
+    # LOAD_COST, and a slot with no free same-day neighbour for that mentor
+    # costs SPREAD_COST so that assignments cluster into contiguous blocks.
+    #
+    # source -> student -> entry(slot, student stream)
+    #        -> group(slot, mentor stream) -> mentor -> sink
+    # Each mentor sits in exactly one group per slot, so the unit
+    # group -> mentor arc is the (mentor, slot) capacity.
+    # The result is deterministic; seed only keeps the engine signature
+    # uniform.
+    num_students = len(student_masks)
+    g = MinCostFlow(2)
+    source, sink = 0, 1
+
+    mentor_nodes = []
+    for free in mentor_free:
+        node = g.add_node()
+        mentor_nodes.append(node)
+        if free:
+            g.add_edge(node, sink, 1, 0)
+            g.add_edge(node, sink, num_students, LOAD_COST)
+    mentor_of_node = {node: m_idx for m_idx, node in enumerate(mentor_nodes)}
+
+    kinds = range(ALL_STREAMS + 1)
+    entries = {}
+    slot_of_group = {}
+    for slot_id in range(catalog.size):
+        bit = 1 << slot_id
+        same_day_neighbours = catalog.adjacent_masks[slot_id]
+        groups = {}
+        for m_idx, free in enumerate(mentor_free):
+            if not free & bit:
+                continue
+            mtype = mentor_streams[m_idx]
+            group = groups.get(mtype)
+            if group is None:
+                group = groups[mtype] = g.add_node()
+                slot_of_group[group] = slot_id
+            g.add_edge(group, mentor_nodes[m_idx], 1, 0 if free & same_day_neighbours else SPREAD_COST)
+        if not groups:
+            continue
+
+        slot_entries = entries[slot_id] = {}
+        for kind in kinds:
+            entry = slot_entries[kind] = g.add_node()
+            for mtype, group in groups.items():
+                matched = kind == ALL_STREAMS or mtype & kind
+                g.add_edge(entry, group, num_students, 0 if matched else STREAM_PENALTY)
+
+    # Students with the same availability and stream are interchangeable,
+    # so they share one node whose source arc carries the class size.
+    classes = {}
+    for s_idx, s_mask in enumerate(student_masks):
+        classes.setdefault((s_mask, student_streams[s_idx]), []).append(s_idx)
+
+    class_nodes = []
+    for (s_mask, kind), members in classes.items():
+        node = g.add_node()
+        class_nodes.append((node, members))
+        g.add_edge(source, node, len(members), 0)
+        for slot_id in iter_bits(s_mask):
+            slot_entries = entries.get(slot_id)
+            if slot_entries:
+                g.add_edge(node, slot_entries[kind], len(members), 0)
+
+    g.flow(source, sink)
+
+    # Flow is conserved at every class, entry and group node, so following
+    # arcs that carry flow down to a mentor, consuming one unit per step,
+    # decomposes the flow into one (mentor, slot) per student.
+    through = set(slot_of_group)
+    through.update(node for slot_entries in entries.values() for node in slot_entries.values())
+    through.update(node for node, _ in class_nodes)
+    routed = {}
+    for e in range(0, len(g.to), 2):
+        flow = g.cap[e + 1]
+        u = g.to[e + 1]
+        if flow and u in through:
+            routed.setdefault(u, []).append([g.to[e], flow])
+
+    assignments = [None] * num_students
+    for node, members in class_nodes:
+        for s_idx in members:
+            if not routed.get(node):
+                break
+            u = node
+            while u in through:
+                group = u
+                arc = routed[u][-1]
+                arc[1] -= 1
+                if not arc[1]:
+                    routed[u].pop()
+                u = arc[0]
+            assignments[s_idx] = (mentor_of_node[u], slot_of_group[group])
+    return assignments
@@ -0,0 +1,55 @@
+import random
+
+from api.slots import FreeMentorIndex, iter_bits
+
+
+def calculate_shift_score(catalog, assigned: int, slot_id: int, rng=random) -> float:
+    # Masking with the slot's day gives the mentor's assignments on that day;
+    # adjacency never crosses into the previous or next day.
+    score = 0
+    same_day = assigned & catalog.day_masks[slot_id]
+    if same_day:
+        if same_day & catalog.adjacent_masks[slot_id]:
+            score += 100
+    elif assigned:
+        score += 10
+    return score + rng.random()
+
+
+def match_greedy(catalog, student_masks, student_streams, mentor_free, mentor_streams, seed=None):
+    rng = random.Random(seed)
+    mentor_assigned = [0] * len(mentor_free)
+    free_index = FreeMentorIndex(catalog.size)
+    for m_idx, free in enumerate(mentor_free):
+        free_index.add(m_idx, free, mentor_streams[m_idx])
+
+    assignments = []
+    for s_mask, s_stream_mask in zip(student_masks, student_streams):
+        assigned_mentor, assigned_slot = None, None
+        candidates = []
+
+        for slot_id in iter_bits(s_mask):
+            for m_idx in free_index.candidates(slot_id, s_stream_mask):
+                candidates.append((m_idx, slot_id))
+
+        if candidates:
+            assigned_mentor, assigned_slot = min(
+                candidates,
+                key=lambda x: (
+                    1 if mentor_assigned[x[0]] else 0,
+                    -calculate_shift_score(catalog, mentor_assigned[x[0]], x[1], rng),
+                ),
+            )
+        else:
+            for slot_id in iter_bits(s_mask):
+                if free_index.any[slot_id]:
+                    assigned_mentor, assigned_slot = min(free_index.any[slot_id]), slot_id
+                    break
+
+        if assigned_mentor is not None:
+            free_index.remove(assigned_mentor, assigned_slot)
+            mentor_assigned[assigned_mentor] |= 1 << assigned_slot
+            assignments.append((assigned_mentor, assigned_slot))
+        else:
+            assignments.append(None)
+    return assignments
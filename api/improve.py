@@ -0,0 +1,191 @@
+import random
+import time
+
+from api.slots import ALL_STREAMS, FreeMentorIndex, iter_bits
+
+MATCH_WEIGHT = 10000
+STREAM_WEIGHT = 100
+DAY_WEIGHT = 2
+ADJACENT_WEIGHT = 1
+STALL_LIMIT = 5000
+
+
+def improve_matching(catalog, current, students, mentors, seconds: float, seed=None):
+    # Anytime local search after a matching engine has run.
+    # current:  student name -> (mentor name, slot id) or None
+    # students: student name -> (slot mask, stream mask)
+    # mentors:  mentor name -> (slot mask, stream mask)
+    # Moves are only applied when they do not lower the objective, so the
+    # state is always the best found so far and can be returned as soon as
+    # the deadline passes. `seconds` covers the whole call: setup, the two
+    # objective evaluations and every inner candidate loop.
+    # Returns (assignments, before, after).
+    deadline = time.monotonic() + seconds
+    rng = random.Random(seed)
+    s_names = list(students)
+    m_names = list(mentors)
+    m_ids = {m_name: i for i, m_name in enumerate(m_names)}
+    s_mask = [students[s_name][0] for s_name in s_names]
+    s_stream = [students[s_name][1] for s_name in s_names]
+    m_free = [mentors[m_name][0] for m_name in m_names]
+    m_stream = [mentors[m_name][1] for m_name in m_names]
+    day_index = catalog.day_index
+    adjacent = catalog.adjacent_masks
+
+    assign = [None] * len(s_names)
+    holders = [{} for _ in range(catalog.size)]
+    m_assigned = [0] * len(m_names)
+    for s_idx, s_name in enumerate(s_names):
+        pair = current.get(s_name)
+        if pair is None or pair[0] not in m_ids:
+            continue
+        m_idx, slot_id = m_ids[pair[0]], pair[1]
+        if m_idx in holders[slot_id]:
+            continue
+        assign[s_idx] = (m_idx, slot_id)
+        holders[slot_id][m_idx] = s_idx
+        m_assigned[m_idx] |= 1 << slot_id
+    free_index = FreeMentorIndex(catalog.size)
+    for m_idx, free in enumerate(m_free):
+        free_index.add(m_idx, free & ~m_assigned[m_idx], m_stream[m_idx])
+
+    def stream_ok(s_idx, m_idx):
+        return s_stream[s_idx] == ALL_STREAMS or bool(s_stream[s_idx] & m_stream[m_idx])
+
+    def mentor_score(mask):
+        days = {day_index[slot_id] for slot_id in iter_bits(mask)}
+        pairs = sum(bin(mask & adjacent[slot_id]).count("1") for slot_id in iter_bits(mask)) // 2
+        return ADJACENT_WEIGHT * pairs - DAY_WEIGHT * len(days)
+
+    def delta(changes):
+        masks = {}
+        gain = 0
+        for s_idx, _ in changes:
+            if assign[s_idx] is not None:
+                m_idx, slot_id = assign[s_idx]
+                masks[m_idx] = masks.get(m_idx, m_assigned[m_idx]) & ~(1 << slot_id)
+                gain -= MATCH_WEIGHT + STREAM_WEIGHT * stream_ok(s_idx, m_idx)
+        for s_idx, pair in changes:
+            if pair is not None:
+                m_idx, slot_id = pair
+                masks[m_idx] = masks.get(m_idx, m_assigned[m_idx]) | (1 << slot_id)
+                gain += MATCH_WEIGHT + STREAM_WEIGHT * stream_ok(s_idx, m_idx)
+        for m_idx, mask in masks.items():
+            gain += mentor_score(mask) - mentor_score(m_assigned[m_idx])
+        return gain
+
+    applied = [0]
+
+    def expired():
+        return time.monotonic() >= deadline
+
+    def apply(changes):
+        applied[0] += 1
+        for s_idx, _ in changes:
+            if assign[s_idx] is not None:
+                m_idx, slot_id = assign[s_idx]
+                del holders[slot_id][m_idx]
+                m_assigned[m_idx] &= ~(1 << slot_id)
+                free_index.add(m_idx, 1 << slot_id, m_stream[m_idx])
+                assign[s_idx] = None
+        for s_idx, pair in changes:
+            if pair is not None:
+                m_idx, slot_id = pair
+                free_index.remove(m_idx, slot_id)
+                holders[slot_id][m_idx] = s_idx
+                m_assigned[m_idx] |= 1 << slot_id
+                assign[s_idx] = pair
+
+    def best_free(s_idx, exclude_slot=None):
+        best, best_gain = None, None
+        for slot_id in iter_bits(s_mask[s_idx]):
+            if slot_id == exclude_slot:
+                continue
+            if expired():
+                break
+            for m_idx in free_index.any[slot_id]:
+                gain = delta([(s_idx, (m_idx, slot_id))])
+                if best_gain is None or gain > best_gain:
+                    best, best_gain = (m_idx, slot_id), gain
+        return best, best_gain
+
+    def try_place(s_idx):
+        # a free pair if there is one, otherwise move one holder of a pair in
+        # the student's slots to a free pair of its own (augmenting step)
+        pair, _ = best_free(s_idx)
+        if pair is not None:
+            apply([(s_idx, pair)])
+            return True
+        for slot_id in iter_bits(s_mask[s_idx]):
+            for m_idx, h_idx in list(holders[slot_id].items()):
+                if expired():
+                    return False
+                alternative, _ = best_free(h_idx)
+                if alternative is not None:
+                    apply([(h_idx, alternative), (s_idx, (m_idx, slot_id))])
+                    return True
+        return False
+
+    def try_relocate(s_idx):
+        slots = list(iter_bits(s_mask[s_idx]))
+        slot_id = rng.choice(slots)
+        pool = free_index.any[slot_id]
+        if not pool:
+            return None
+        changes = [(s_idx, (rng.choice(tuple(pool)), slot_id))]
+        return changes, delta(changes)
+
+    def try_swap(s_idx):
+        m_idx, slot_id = assign[s_idx]
+        other_slot = rng.choice(list(iter_bits(s_mask[s_idx])))
+        if not holders[other_slot]:
+            return None
+        o_mentor, o_idx = rng.choice(tuple(holders[other_slot].items()))
+        if o_idx == s_idx or not s_mask[o_idx] & (1 << slot_id):
+            return None
+        changes = [(s_idx, (o_mentor, other_slot)), (o_idx, (m_idx, slot_id))]
+        return changes, delta(changes)
+
+    def evaluate():
+        matched = [(s_idx, pair) for s_idx, pair in enumerate(assign) if pair is not None]
+        streams = sum(1 for s_idx, (m_idx, _) in matched if stream_ok(s_idx, m_idx))
+        days = pairs = 0
+        for mask in m_assigned:
+            days += len({day_index[slot_id] for slot_id in iter_bits(mask)})
+            pairs += sum(bin(mask & adjacent[slot_id]).count("1") for slot_id in iter_bits(mask)) // 2
+        return {
+            "matched": len(matched),
+            "stream_matches": streams,
+            "mentor_days": days,
+            "adjacent_pairs": pairs,
+            "score": MATCH_WEIGHT * len(matched) + STREAM_WEIGHT * streams + ADJACENT_WEIGHT * pairs - DAY_WEIGHT * days,
+        }
+
+    started = time.monotonic()
+    before = evaluate()
+    # keep time for the closing evaluation, which costs about the same
+    deadline -= time.monotonic() - started
+    for s_idx in range(len(s_names)):
+        if expired():
+            break
+        if assign[s_idx] is None and s_mask[s_idx]:
+            try_place(s_idx)
+
+    placed = [s_idx for s_idx, pair in enumerate(assign) if pair is not None]
+    stalled = 0
+    while placed and stalled < STALL_LIMIT and not expired():
+        s_idx = rng.choice(placed)
+        move = try_relocate(s_idx) if rng.random() < 0.5 else try_swap(s_idx)
+        if move is None:
+            stalled += 1
+            continue
+        changes, gain = move
+        stalled = 0 if gain > 0 else stalled + 1
+        if gain >= 0:
+            apply(changes)
+
+    result = {}
+    for s_idx, s_name in enumerate(s_names):
+        pair = assign[s_idx]
+        result[s_name] = (m_names[pair[0]], pair[1]) if pair else None
+    return result, before, evaluate() if applied[0] else before
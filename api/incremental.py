@@ -0,0 +1,150 @@
+import threading
+from collections import deque
+
+from api.slots import ALL_STREAMS, FreeMentorIndex, iter_bits
+
+
+class ChangeLog:
+    # Names of students and mentors submitted since this process last wrote
+    # the results sheet. Until it has written results once, it cannot tell
+    # what changed before it started and delta() returns None.
+    def __init__(self):
+        self._names = {}
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def record(self, sheet_name: str, name):
+        with self._lock:
+            self._names.setdefault(sheet_name, set()).add(name)
+
+    def reset(self):
+        with self._lock:
+            self._names = {}
+            self._complete = True
+
+    def delta(self):
+        with self._lock:
+            if not self._complete:
+                return None
+            return {sheet_name: set(names) for sheet_name, names in self._names.items()}
+
+
+def repair_matching(catalog, previous, students, mentors, dirty_students=None, max_depth=3):
+    # previous: student name -> (mentor name, slot id) or None
+    # students: student name -> (slot mask, stream mask)
+    # mentors:  mentor name -> (slot mask, stream mask)
+    # dirty_students: names added or changed since `previous`. Only they and
+    #           students who lost their pairing may displace announced
+    #           pairings; other unplaced students just take free slots. None
+    #           lets every unplaced student do so.
+    # Every kept pairing is re-validated against the current masks (a bit
+    # test each), so edits this process never saw cannot leave a pairing
+    # the student or mentor no longer offers.
+    # Returns (assignments, moved) where moved lists students whose existing
+    # pairing had to change so that someone else could be placed.
+    mentor_names = list(mentors)
+    mentor_ids = {m_name: i for i, m_name in enumerate(mentor_names)}
+    mentor_streams = [mentors[m_name][1] for m_name in mentor_names]
+    mentor_assigned = [0] * len(mentor_names)
+    holders = [{} for _ in range(catalog.size)]
+    assignments = {}
+    displaced = set()
+
+    for s_name, pair in previous.items():
+        if s_name not in students or pair is None:
+            continue
+        m_name, slot_id = pair
+        m_idx = mentor_ids.get(m_name)
+        bit = 1 << slot_id
+        if m_idx is None or m_idx in holders[slot_id] or not students[s_name][0] & bit or not mentors[m_name][0] & bit:
+            displaced.add(s_name)
+            continue
+        assignments[s_name] = (m_idx, slot_id)
+        holders[slot_id][m_idx] = s_name
+        mentor_assigned[m_idx] |= 1 << slot_id
+
+    free_index = FreeMentorIndex(catalog.size)
+    for m_idx, m_name in enumerate(mentor_names):
+        free_index.add(m_idx, mentors[m_name][0] & ~mentor_assigned[m_idx], mentor_streams[m_idx])
+
+    def take(s_name, m_idx, slot_id):
+        free_index.remove(m_idx, slot_id)
+        mentor_assigned[m_idx] |= 1 << slot_id
+        holders[slot_id][m_idx] = s_name
+        assignments[s_name] = (m_idx, slot_id)
+
+    def release(s_name):
+        m_idx, slot_id = assignments.pop(s_name)
+        del holders[slot_id][m_idx]
+        mentor_assigned[m_idx] &= ~(1 << slot_id)
+        free_index.add(m_idx, 1 << slot_id, mentor_streams[m_idx])
+
+    def best_free(s_name, any_stream=False):
+        s_mask, s_stream = students[s_name]
+        best, best_key = None, None
+        for slot_id in iter_bits(s_mask):
+            pool = free_index.any[slot_id] if any_stream else free_index.candidates(slot_id, s_stream)
+            same_day_neighbours = catalog.adjacent_masks[slot_id]
+            for m_idx in pool:
+                assigned = mentor_assigned[m_idx]
+                key = (1 if assigned else 0, 0 if assigned & same_day_neighbours else 1, m_idx)
+                if best_key is None or key < best_key:
+                    best, best_key = (m_idx, slot_id), key
+        return best
+
+    def augment(root):
+        # BFS over students: each hop hands a held pair to the previous
+        # student, so the shortest chain moves the fewest announced pairings.
+        parent = {root: None}
+        queue = deque([(root, 0)])
+        while queue:
+            u, depth = queue.popleft()
+            if u != root:
+                pair = best_free(u)
+                if pair is not None:
+                    chain = [(u, pair)]
+                    while parent[u] is not None:
+                        u, held = parent[u]
+                        chain.append((u, held))
+                    for s_name, (m_idx, slot_id) in chain:
+                        if s_name in assignments:
+                            release(s_name)
+                        take(s_name, m_idx, slot_id)
+                    return [s_name for s_name, _ in chain[:-1]]
+            if depth >= max_depth:
+                continue
+            u_mask, u_stream = students[u]
+            for slot_id in iter_bits(u_mask):
+                for m_idx, holder in holders[slot_id].items():
+                    if holder in parent:
+                        continue
+                    if u_stream != ALL_STREAMS and not u_stream & mentor_streams[m_idx]:
+                        continue
+                    parent[holder] = (u, (m_idx, slot_id))
+                    queue.append((holder, depth + 1))
+        return None
+
+    moved = []
+    pending = sorted(
+        (s_name for s_name in students if s_name not in assignments),
+        key=lambda s_name: bin(students[s_name][0]).count("1"),
+    )
+    for s_name in pending:
+        pair = best_free(s_name)
+        if pair is not None:
+            take(s_name, *pair)
+            continue
+        may_displace = dirty_students is None or s_name in dirty_students or s_name in displaced
+        chain = augment(s_name) if max_depth and may_displace else None
+        if chain is not None:
+            moved.extend(chain)
+            continue
+        pair = best_free(s_name, any_stream=True)
+        if pair is not None:
+            take(s_name, *pair)
+
+    result = {}
+    for s_name in students:
+        pair = assignments.get(s_name)
+        result[s_name] = (mentor_names[pair[0]], pair[1]) if pair else None
+    return result, moved
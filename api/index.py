@@ -1,16 +1,39 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import hmac
 import json
 import os
 import random
-from functools import lru_cache
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import gspread
-import pandas as pd
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from oauth2client.service_account import ServiceAccountCredentials
+from api.startup import lazy_import, startup_report, timed_import
+
+with timed_import("fastapi"):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+    from fastapi.staticfiles import StaticFiles
+    from starlette.concurrency import run_in_threadpool
+
+with timed_import("api"):
+    from api import metrics, sheets_client
+    from api.admin_tables import DEFAULT_PER_PAGE, FILTERS, build_views
+    from api.cache import TTLCache
+    from api.engines import ENGINES
+    from api.export import CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, csv_chunks, xlsx_chunks
+    from api.improve import improve_matching
+    from api.incremental import ChangeLog, repair_matching
+    from api.records import Assignment, Mentor, Student, Table, table_of
+    from api.scenarios import run_scenarios, validate_scenario
+    from api.sheets_client import SheetsUnavailable
+    from api.slots import stream_mask
+    from api.snapshots import SnapshotStore, diff_snapshots, input_hashes, make_snapshot
+    from api.storage import KEY_COLUMNS, create_storage
+    from api.submissions import SubmissionQueue
+    from api.timetable import load_timetable
 
 app = FastAPI()
 
@@ -20,7 +43,7 @@ async def debug_exception_handler(request: Request, exc: Exception):
     import traceback
     # gather additional template environment info to help debug Jinja errors
     try:
-        tmpl_loader = getattr(templates, 'env', None)
+        tmpl_loader = getattr(get_templates(), 'env', None)
         loader_info = None
         if tmpl_loader is not None:
             loader = getattr(tmpl_loader, 'loader', None)
@@ -40,17 +63,69 @@ async def debug_exception_handler(request: Request, exc: Exception):
     return PlainTextResponse(body, status_code=500)
 
 
+@app.exception_handler(SheetsUnavailable)
+async def sheets_unavailable_handler(request: Request, exc: SheetsUnavailable):
+    # Never render a page from a failed read: an empty table here would look
+    # like "no students" and a following save could overwrite real data.
+    body = f"Googleスプレッドシートに接続できません。しばらくしてから再度お試しください。\n\n{exc}\n"
+    return PlainTextResponse(body, status_code=503, headers={"Retry-After": "30"})
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    # Route latency plus the Sheets and matching time spent inside the
+    # request, also returned to the browser as a Server-Timing header.
+    started = time.perf_counter()
+    token = metrics.start_request()
+    budget = sheets_client.start_budget(SHEETS_CALL_BUDGET)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        timings = metrics.end_request(token)
+        sheets_client.end_budget(budget)
+        route = route_label(request.scope.get("endpoint"))
+        metrics.registry.observe(
+            "http_request_duration_seconds", elapsed, route=route, method=request.method, status=status
+        )
+        calls, seconds = timings.get("sheets", (0, 0.0))
+        metrics.registry.observe("http_request_sheets_calls", calls, buckets=metrics.COUNT_BUCKETS, route=route)
+        metrics.registry.observe("http_request_sheets_seconds", seconds, route=route)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+
+@functools.lru_cache(maxsize=None)
+def route_label(endpoint) -> str:
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint:
+            return route.path
+    return "unmatched"
+
+
+@app.get("/_metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/_diag")
 def diag():
     # return basic diagnostics about template environment and paths
     try:
-        env = getattr(templates, 'env', None)
+        env = getattr(get_templates(), 'env', None)
         loader = getattr(env, 'loader', None) if env is not None else None
         return {
             'templates_dir': str(TEMPLATES_DIR),
             'templates_env': type(env).__name__ if env is not None else None,
             'loader_type': type(loader).__name__ if loader is not None else None,
             'loader_searchpath': getattr(loader, 'searchpath', None),
+            'storage': storage.stats(),
+            'sheets_mirror': sheets_mirror.stats() if sheets_mirror is not None else None,
+            'submission_queue': submission_queue.stats(),
+            'sheets_quota': sheets_client.bucket.stats(),
+            'startup': startup_report(),
         }
     except Exception as e:
         return {'error': str(e)}
@@ -59,256 +134,338 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-
-DAYS_WEEKDAY = ["6/29", "6/30", "7/1", "7/2", "7/3"]
-HOURS_WEEKDAY = range(19, 23)
-DAYS_WEEKEND = ["7/4", "7/5"]
-HOURS_WEEKEND = range(10, 23)
-ALL_DAYS_ORDER = DAYS_WEEKDAY + DAYS_WEEKEND
-TIME_SLOTS = [f"{d} {h}:00-{h+1}:00" for d in DAYS_WEEKDAY for h in HOURS_WEEKDAY] + [f"{d} {h}:00-{h+1}:00" for d in DAYS_WEEKEND for h in HOURS_WEEKEND]
+
+
+@functools.lru_cache()
+def get_templates():
+    return lazy_import("fastapi.templating").Jinja2Templates(directory=str(TEMPLATES_DIR))
+
+
+TIMETABLE = load_timetable()
+TIME_SLOTS = TIMETABLE.labels
 GRADES = ["中1", "中2", "中3", "高1", "高2", "高3"]
 MENTOR_STREAMS = ["文系", "理系"]
+SLOT_CATALOG = TIMETABLE.catalog
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin")
+IMPROVE_SECONDS = float(os.environ.get("MATCH_IMPROVE_SECONDS", "5"))
+SCENARIO_WORKERS = int(os.environ.get("SCENARIO_WORKERS", "0")) or None
+ADMIN_TOKEN_SECONDS = 8 * 3600
+EXPORT_SHEETS = ("results", "students", "mentors")
+EXPORT_HIDDEN_COLUMNS = {"パスワード"}
+SHEETS_CALL_BUDGET = int(os.environ.get("SHEETS_CALL_BUDGET", "25"))
+
+storage, sheets_mirror = create_storage(os.environ.get("STORAGE_BACKEND", "sheets"))
+submission_queue = SubmissionQueue(
+    storage,
+    flush_interval=float(os.environ.get("SUBMISSION_FLUSH_MS", "0")) / 1000,
+    max_rows=int(os.environ.get("SUBMISSION_FLUSH_ROWS", "50")),
+    journal_path=os.environ.get("SUBMISSION_JOURNAL", "/tmp/scheduling_app_submissions.json"),
+)
+app.add_event_handler("shutdown", submission_queue.close)
+snapshot_store = SnapshotStore()
+change_log = ChangeLog()
+admin_views = TTLCache(float(os.environ.get("SHEET_CACHE_TTL", "15")))
+metrics.registry.add_collector(storage.collect_metrics)
+metrics.registry.add_collector(sheets_client.collect_metrics)
+storage_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("STORAGE_IO_WORKERS", "8")),
+    thread_name_prefix="storage-io",
+)
+
+
+def load_data_from_sheet(sheet_name: str) -> Table:
+    return submission_queue.overlay(sheet_name, storage.load(sheet_name))
+
+
+def load_data_from_sheets(sheet_names) -> dict:
+    tables = storage.load_many(sheet_names)
+    return {name: submission_queue.overlay(name, table) for name, table in tables.items()}
+
+
+def save_data_to_sheet(table: Table, sheet_name: str):
+    storage.save(table, sheet_name)
+    if sheet_name == "results":
+        change_log.reset()
+    admin_views.invalidate()
+
+
+def append_data_to_sheet(table: Table, sheet_name: str):
+    storage.append(table, sheet_name)
+    admin_views.invalidate()
+
+
+def upsert_row_to_sheet(row: dict, sheet_name: str) -> bool:
+    existed = submission_queue.submit(row, sheet_name)
+    change_log.record(sheet_name, row[KEY_COLUMNS[sheet_name]])
+    admin_views.invalidate()
+    return existed
+
+
+def load_admin_views() -> dict:
+    # Indexed copies of the admin tables, shared by every page request until
+    # a write on this instance or the cache TTL expires them.
+    views = admin_views.get("all")
+    if views is None:
+        tables = load_data_from_sheets(["students", "mentors", "results"])
+        # the slot filter comes from the storage's slot index where it keeps
+        # one; queued rows are not in it yet, so fall back while any wait
+        slot_postings = {}
+        if not submission_queue.stats()["pending"]:
+            slot_postings = {name: storage.slot_postings(name) for name in ("students", "mentors")}
+        views = build_views(
+            tables["students"], tables["mentors"], tables["results"], get_sort_key, GRADES, slot_postings
+        )
+        admin_views.put("all", views)
+    return views
 
 
-@lru_cache()
-def get_spreadsheet():
-    gcp_json = os.environ.get("GCP_SERVICE_ACCOUNT_JSON")
-    spreadsheet_url = os.environ.get("SPREADSHEET_URL")
-    if not gcp_json or not spreadsheet_url:
-        raise RuntimeError("Missing GCP_SERVICE_ACCOUNT_JSON or SPREADSHEET_URL environment variable")
+def issue_admin_token(now=None) -> str:
+    expires = int((now or time.time()) + ADMIN_TOKEN_SECONDS)
+    signature = hmac.new(ADMIN_PASSWORD.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
 
-    credentials_json = json.loads(gcp_json)
-    if "private_key" in credentials_json:
-        credentials_json["private_key"] = credentials_json["private_key"].replace("\\n", "\n")
 
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_json, scope)
-    client = gspread.authorize(creds)
-    return client.open_by_url(spreadsheet_url)
+def admin_token_valid(token: str) -> bool:
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(ADMIN_PASSWORD.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
 
 
-def load_data_from_sheet(sheet_name: str) -> pd.DataFrame:
-    try:
-        sh = get_spreadsheet()
-        try:
-            worksheet = sh.worksheet(sheet_name)
-        except Exception:
-            return pd.DataFrame()
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        if "パスワード" in df.columns:
-            df["パスワード"] = df["パスワード"].astype(str)
-        return df.fillna("")
-    except Exception:
-        return pd.DataFrame()
+async def run_storage_io(func, *args, **kwargs):
+    # run in a copy of the request context so Sheets calls count towards it
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(storage_executor, functools.partial(context.run, func, *args, **kwargs))
 
 
-def save_data_to_sheet(df: pd.DataFrame, sheet_name: str):
-    sh = get_spreadsheet()
-    try:
-        worksheet = sh.worksheet(sheet_name)
-    except Exception:
-        worksheet = sh.add_worksheet(title=sheet_name, rows=100, cols=20)
-    df = df.fillna("")
-    worksheet.clear()
-    if not df.empty:
-        worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+async def load_data_from_sheet_async(sheet_name: str) -> Table:
+    return await run_storage_io(load_data_from_sheet, sheet_name)
 
 
-def append_data_to_sheet(df: pd.DataFrame, sheet_name: str):
-    sh = get_spreadsheet()
-    try:
-        worksheet = sh.worksheet(sheet_name)
-    except Exception:
-        worksheet = sh.add_worksheet(title=sheet_name, rows=100, cols=20)
-    df = df.fillna("")
-    existing_data = worksheet.get_all_values()
-    if not existing_data:
-        worksheet.update([df.columns.values.tolist()] + df.values.tolist())
-    else:
-        worksheet.append_rows(df.values.tolist())
+async def load_data_from_sheets_async(sheet_names) -> dict:
+    return await run_storage_io(load_data_from_sheets, sheet_names)
+
+
+async def save_data_to_sheet_async(table: Table, sheet_name: str):
+    await run_storage_io(save_data_to_sheet, table, sheet_name)
+
+
+async def upsert_row_to_sheet_async(row: dict, sheet_name: str) -> bool:
+    return await run_storage_io(upsert_row_to_sheet, row, sheet_name)
+
+
+async def get_status_async() -> bool:
+    return await run_storage_io(get_status)
+
+
+async def set_status_async(is_open: bool):
+    await run_storage_io(set_status, is_open)
+
+
+def status_from_settings(table: Table) -> bool:
+    if table.empty or "status" not in table.columns:
+        return True
+    return table.rows[0]["status"] == "OPEN"
 
 
 def get_status() -> bool:
     try:
-        df = load_data_from_sheet("settings")
-        if df.empty or "status" not in df.columns:
-            return True
-        return df.iloc[0]["status"] == "OPEN"
+        return status_from_settings(load_data_from_sheet("settings"))
     except Exception:
         return True
 
 
 def set_status(is_open: bool):
-    df = pd.DataFrame([{"status": "OPEN" if is_open else "CLOSED"}])
-    save_data_to_sheet(df, "settings")
+    save_data_to_sheet(Table([{"status": "OPEN" if is_open else "CLOSED"}]), "settings")
 
 
 def get_sort_key(val):
-    if not val or pd.isna(val) or not isinstance(val, str):
-        return (99, 99)
-    try:
-        parts = val.split(" ")
-        if len(parts) < 2:
-            return (99, 99)
-        date_part, time_part = parts[0], parts[1]
-        d_index = ALL_DAYS_ORDER.index(date_part) if date_part in ALL_DAYS_ORDER else 99
-        h_num = int(time_part.split(":")[0])
-        return (d_index, h_num)
-    except Exception:
-        return (99, 99)
+    return TIMETABLE.sort_key(val)
 
 
-def calculate_shift_score(m_name, target_slot, mentor_assignments):
-    score = 0
-    assigned = mentor_assignments.get(m_name, set())
-    current_day = target_slot.split(" ")[0]
-    day_shifts = [s for s in assigned if s.startswith(current_day)]
-    if not day_shifts:
-        if assigned:
-            score += 10
-    else:
-        idx = TIME_SLOTS.index(target_slot) if target_slot in TIME_SLOTS else -1
-        if idx != -1:
-            adj = [TIME_SLOTS[idx - 1] if idx > 0 else "", TIME_SLOTS[idx + 1] if idx < len(TIME_SLOTS) - 1 else ""]
-            if any(a in assigned for a in adj):
-                score += 100
-    return score + random.random()
+MATCHING_ENGINES = {name: functools.partial(engine, SLOT_CATALOG) for name, engine in ENGINES.items()}
+
+
+def run_matching(students, mentors, engine: str = "greedy", seed=None):
+    if engine not in MATCHING_ENGINES:
+        raise ValueError(f"Unknown matching engine: {engine}")
 
+    mentor_free = [SLOT_CATALOG.mask_of_cell(mentor.slots) for mentor in mentors]
+    mentor_streams = [stream_mask(mentor.stream) for mentor in mentors]
+
+    students = sorted(students, key=lambda student: len(str(student.slots).split(",")) if student.slots else 0)
+    with metrics.matching_timer(engine):
+        assignments = MATCHING_ENGINES[engine](
+            [SLOT_CATALOG.mask_of_cell(student.slots) for student in students],
+            [stream_mask(student.stream) for student in students],
+            mentor_free,
+            mentor_streams,
+            seed=seed,
+        )
 
-def run_matching(df_st: pd.DataFrame, df_mt: pd.DataFrame):
     results = []
-    mentor_schedule = {}
-    mentor_streams = {}
-    mentor_assignments = {}
-    mentor_names_list = list(df_mt["メンター氏名"])
-
-    for _, row in df_mt.iterrows():
-        m_name = row["メンター氏名"]
-        mentor_schedule[m_name] = set(str(row["可能日時"]).split(",")) if row["可能日時"] else set()
-        mentor_assignments[m_name] = set()
-        mentor_streams[m_name] = str(row["文理"]).split(",") if row["文理"] else []
-
-    students_list = []
-    for _, s_row in df_st.iterrows():
-        s_slots = str(s_row["可能日時"]).split(",") if s_row["可能日時"] else []
-        students_list.append({
-            "data": s_row,
-            "s_slots_set": set([s.strip() for s in s_slots]),
-            "num_slots": len(s_slots),
-        })
-    students_list.sort(key=lambda x: x["num_slots"])
-
-    def is_unmatched(m_name):
-        return len(mentor_assignments[m_name]) == 0
-
-    for s_obj in students_list:
-        s_row = s_obj["data"]
-        s_name = s_row["生徒氏名"]
-        s_stream = s_row["文理"]
-        s_slots = s_obj["s_slots_set"]
-        assigned_mentor, assigned_slot = None, None
-        candidates = []
-
-        for slot in s_slots:
-            for m_name in mentor_names_list:
-                if slot in mentor_schedule[m_name]:
-                    if s_stream == "未定" or s_stream in mentor_streams.get(m_name, []):
-                        candidates.append((m_name, slot))
-
-        if candidates:
-            candidates.sort(
-                key=lambda x: (
-                    0 if is_unmatched(x[0]) else 1,
-                    -calculate_shift_score(x[0], x[1], mentor_assignments),
-                )
-            )
-            assigned_mentor, assigned_slot = candidates[0]
-        else:
-            for slot in s_slots:
-                for m_name in mentor_names_list:
-                    if slot in mentor_schedule[m_name]:
-                        assigned_mentor, assigned_slot = m_name, slot
-                        break
-                if assigned_mentor:
-                    break
-
-        if assigned_mentor:
-            mentor_schedule[assigned_mentor].remove(assigned_slot)
-            mentor_assignments[assigned_mentor].add(assigned_slot)
-            results.append({
-                "生徒氏名": s_name,
-                "決定メンター": assigned_mentor,
-                "決定日時": assigned_slot,
-                "ステータス": "決定",
-                "学校": s_row["学校"],
-                "学年": s_row["学年"],
-                "生徒文理": s_stream,
-            })
+    for student, assignment in zip(students, assignments):
+        if assignment is not None:
+            m_idx, slot_id = assignment
+            results.append(Assignment(student, mentors[m_idx].name, SLOT_CATALOG.labels[slot_id]))
         else:
-            results.append({
-                "生徒氏名": s_name,
-                "決定メンター": "",
-                "決定日時": "",
-                "ステータス": "未定(空きなし)",
-                "学校": s_row["学校"],
-                "学年": s_row["学年"],
-                "生徒文理": s_stream,
-            })
+            results.append(Assignment(student))
+    return results
 
+
+def slot_stream_masks(records):
+    return {
+        record.name: (SLOT_CATALOG.mask_of_cell(record.slots), stream_mask(record.stream))
+        for record in records
+    }
+
+
+def assignments_from_pairs(students, pairs):
+    results = []
+    for student in students:
+        pair = pairs.get(student.name)
+        if pair is not None:
+            results.append(Assignment(student, pair[0], SLOT_CATALOG.labels[pair[1]]))
+        else:
+            results.append(Assignment(student))
     return results
 
 
-def build_schedule_context(prefix: str, selected_slots):
-    selected = set(s.strip() for s in selected_slots if s)
-    weekday_rows = []
-    weekend_rows = []
-    idx = 0
-
-    for h in HOURS_WEEKDAY:
-        time_label = f"{h}:00-{h+1}:00"
-        cells = []
-        for day in DAYS_WEEKDAY:
-            slot = f"{day} {time_label}"
-            cells.append(
-                {
-                    "day": day,
-                    "slot_name": f"{prefix}_slot_{idx}",
-                    "slot_value": slot,
-                    "checked": slot in selected,
-                }
-            )
-            idx += 1
-        weekday_rows.append({"time": time_label, "cells": cells})
-
-    for h in HOURS_WEEKEND:
-        time_label = f"{h}:00-{h+1}:00"
-        cells = []
-        for day in DAYS_WEEKEND:
-            slot = f"{day} {time_label}"
-            cells.append(
-                {
-                    "day": day,
-                    "slot_name": f"{prefix}_slot_{idx}",
-                    "slot_value": slot,
-                    "checked": slot in selected,
-                }
-            )
-            idx += 1
-        weekend_rows.append({"time": time_label, "cells": cells})
+def run_incremental_matching(students, mentors, previous_results, delta=None):
+    # delta: {"students": names} submitted since previous_results were
+    # written (see ChangeLog); without it any unplaced student may move
+    # announced pairings to get a seat.
+    previous = {}
+    for row in previous_results:
+        slot_id = SLOT_CATALOG.ids.get(str(row.get("決定日時", "")))
+        if row.get("決定メンター") and slot_id is not None:
+            previous[row["生徒氏名"]] = (row["決定メンター"], slot_id)
+
+    with metrics.matching_timer("incremental"):
+        pairs, moved = repair_matching(
+            SLOT_CATALOG,
+            previous,
+            slot_stream_masks(students),
+            slot_stream_masks(mentors),
+            dirty_students=delta.get("students", set()) if delta is not None else None,
+        )
+    return assignments_from_pairs(students, pairs), moved
+
+
+def run_improvement(students, mentors, results, seconds: float = IMPROVE_SECONDS, seed=None):
+    # Local search on top of an engine's results, bounded by `seconds` so it
+    # always finishes inside the function timeout. Returns (results, before,
+    # after) where before/after are the objective breakdowns.
+    started = time.monotonic()
+    current = {}
+    for assignment in results:
+        slot_id = SLOT_CATALOG.ids.get(assignment.slot) if assignment.mentor else None
+        current[assignment.student.name] = (assignment.mentor, slot_id) if slot_id is not None else None
+    student_masks, mentor_masks = slot_stream_masks(students), slot_stream_masks(mentors)
+    # the time spent preparing the inputs comes out of the same budget
+    remaining = max(0.0, seconds - (time.monotonic() - started))
+    with metrics.matching_timer("improve"):
+        pairs, before, after = improve_matching(SLOT_CATALOG, current, student_masks, mentor_masks, remaining, seed=seed)
+    return assignments_from_pairs(students, pairs), before, after
+
+
+def save_snapshot(assignments, students, mentors, engine: str, seed, improved: bool) -> dict:
+    snapshot = make_snapshot(assignments, engine, seed, input_hashes(students, mentors, TIME_SLOTS), improved)
+    snapshot_store.save(snapshot)
+    return snapshot
+
+
+def assignments_from_snapshot(snapshot: dict, students):
+    # Rebuilds result rows from a stored run without re-running any engine;
+    # school / grade / stream come from the current student data.
+    by_name = {student.name: student for student in students}
+    assignments = []
+    for name, mentor, slot in snapshot["assignments"]:
+        student = by_name.get(name) or Student.from_row({"生徒氏名": name})
+        assignments.append(Assignment(student, mentor or None, slot or None))
+    return assignments
+
+
+def improvement_summary(before: dict, after: dict) -> str:
+    return (
+        f"局所探索: 決定 {before['matched']}→{after['matched']}名、"
+        f"文理一致 {before['stream_matches']}→{after['stream_matches']}名、"
+        f"メンター稼働日 {before['mentor_days']}→{after['mentor_days']}日"
+    )
+
+
+def run_what_if(students, mentors, scenarios, seed=None):
+    # scenarios: list of dicts with optional name, engine, remove_mentors,
+    # remove_students, close_slots and close_days; the unchanged data is
+    # always evaluated first as the baseline, once per engine used.
+    student_masks = slot_stream_masks(students)
+    mentor_masks = slot_stream_masks(mentors)
+    with metrics.matching_timer("scenarios"):
+        return run_scenarios(
+            SLOT_CATALOG,
+            (list(student_masks), [m[0] for m in student_masks.values()], [m[1] for m in student_masks.values()]),
+            (list(mentor_masks), [m[0] for m in mentor_masks.values()], [m[1] for m in mentor_masks.values()]),
+            scenarios,
+            seed=seed,
+            max_workers=SCENARIO_WORKERS,
+        )
+
+
+def parse_scenarios(text: str):
+    scenarios = json.loads(text or "[]")
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+    if not isinstance(scenarios, list):
+        raise ValueError("scenarios must be a list of objects")
+    for scenario in scenarios:
+        validate_scenario(scenario)
+    return scenarios
+
+
+def scenario_context(scenario_results):
+    mentor_names = []
+    for result in scenario_results:
+        mentor_names += [m_name for m_name in result["mentor_load"] if m_name not in mentor_names]
+    return {
+        "scenario_results": scenario_results,
+        "scenario_mentors": [
+            {"name": m_name, "loads": [result["mentor_load"].get(m_name, "-") for result in scenario_results]}
+            for m_name in mentor_names
+        ],
+    }
+
+
+GRID_CELL_MARKER = "\x00"
 
-    return {"weekday_rows": weekday_rows, "weekend_rows": weekend_rows}
+
+@functools.lru_cache(maxsize=None)
+def schedule_grid_segments(prefix: str):
+    # The grid markup only changes with the calendar, so it is rendered once
+    # per form and split at each checkbox's checked attribute.
+    template = get_templates().get_template("schedule_grid.html")
+    html = template.render(TIMETABLE.schedule_context(prefix, [], marker=GRID_CELL_MARKER))
+    return html.split(GRID_CELL_MARKER)
+
+
+def build_schedule_context(prefix: str, selected_slots):
+    segments = schedule_grid_segments(prefix)
+    selected = SLOT_CATALOG.mask_of(selected_slots)
+    parts = [segments[0]]
+    for slot_id, segment in zip(TIMETABLE.cell_order, segments[1:]):
+        parts.append(" checked" if selected >> slot_id & 1 else "")
+        parts.append(segment)
+    return {"schedule_grid_html": "".join(parts)}
 
 
 def extract_slots(form_data, prefix: str):
-    return [value for key, value in form_data.items() if key.startswith(prefix + "_slot_")]
+    return TIMETABLE.extract_slots(form_data, prefix)
 
 
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "index.html",
         {"request": request, "is_accepting": get_status(), "title": "ALOHA面談日程調整"},
     )
@@ -316,7 +473,7 @@ def home(request: Request):
 
 @app.get("/student", response_class=HTMLResponse)
 def student_get(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "student.html",
         {
             "request": request,
@@ -360,7 +517,6 @@ async def student_post(request: Request):
 
     message = None
     if not errors:
-        df_s = load_data_from_sheet("students")
         new_row = {
             "生徒氏名": s_name,
             "LINE名": s_line_name,
@@ -371,14 +527,10 @@ async def student_post(request: Request):
             "質問内容": s_questions,
             "可能日時": ",".join(selected_slots),
         }
-        if not df_s.empty and "生徒氏名" in df_s.columns:
-            df_s = df_s[df_s["生徒氏名"] != s_name]
-            df_s = pd.concat([df_s, pd.DataFrame([new_row])], ignore_index=True)
+        if await upsert_row_to_sheet_async(new_row, "students"):
             message = f"{s_name} さんの情報を更新しました。"
         else:
-            df_s = pd.DataFrame([new_row])
             message = "登録しました。"
-        save_data_to_sheet(df_s, "students")
 
     context = {
         "request": request,
@@ -397,12 +549,12 @@ async def student_post(request: Request):
         "grades": GRADES,
         "streams": ["文系", "理系", "未定"],
     }
-    return templates.TemplateResponse("student.html", context)
+    return get_templates().TemplateResponse("student.html", context)
 
 
 @app.get("/mentor", response_class=HTMLResponse)
 def mentor_get(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "mentor.html",
         {
             "request": request,
@@ -433,14 +585,14 @@ async def mentor_post(request: Request):
         if not name or not password:
             errors.append("氏名とパスワードを入力してください。")
         else:
-            df_m = load_data_from_sheet("mentors")
-            if not df_m.empty and "メンター氏名" in df_m.columns:
-                target = df_m[df_m["メンター氏名"] == name]
-                if not target.empty:
-                    row = target.iloc[0]
-                    if str(row["パスワード"]) == password:
-                        loaded_slots = str(row["可能日時"]).split(",") if row["可能日時"] else []
-                        streams = str(row["文理"]).split(",") if row["文理"] else []
+            mentor_table = await load_data_from_sheet_async("mentors")
+            if not mentor_table.empty and "メンター氏名" in mentor_table.columns:
+                row = mentor_table.find("メンター氏名", name)
+                if row is not None:
+                    mentor = Mentor.from_row(row)
+                    if str(mentor.password) == password:
+                        loaded_slots = str(mentor.slots).split(",") if mentor.slots else []
+                        streams = str(mentor.stream).split(",") if mentor.stream else []
                         is_unavailable = loaded_slots == ["参加不可"]
                         info = f"{name} さんを読み込みました。"
                     else:
@@ -457,7 +609,6 @@ async def mentor_post(request: Request):
         if not selected_slots and not is_unavailable:
             errors.append("日時を1つ以上選択してください。")
         if not errors:
-            df_m = load_data_from_sheet("mentors")
             available_value = "参加不可" if is_unavailable else ",".join(selected_slots)
             new_row = {
                 "メンター氏名": name,
@@ -465,12 +616,7 @@ async def mentor_post(request: Request):
                 "可能日時": available_value,
                 "パスワード": password,
             }
-            if not df_m.empty and "メンター氏名" in df_m.columns:
-                df_m = df_m[df_m["メンター氏名"] != name]
-                df_m = pd.concat([df_m, pd.DataFrame([new_row])], ignore_index=True)
-            else:
-                df_m = pd.DataFrame([new_row])
-            save_data_to_sheet(df_m, "mentors")
+            await upsert_row_to_sheet_async(new_row, "mentors")
             info = "保存しました。"
             loaded_slots = selected_slots if not is_unavailable else ["参加不可"]
 
@@ -483,7 +629,7 @@ async def mentor_post(request: Request):
     if loaded_slots:
         form_values["slots"] = loaded_slots
 
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "mentor.html",
         {
             "request": request,
@@ -498,7 +644,7 @@ async def mentor_post(request: Request):
 
 @app.get("/admin", response_class=HTMLResponse)
 def admin_get(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "admin.html",
         {
             "request": request,
@@ -518,57 +664,243 @@ async def admin_post(request: Request):
     form = await request.form()
     password = form.get("admin_password", "").strip()
     action = form.get("action", "view")
+    engine = form.get("engine", "greedy")
+    improve = form.get("improve") == "on"
+    scenarios_text = form.get("scenarios", "")
+    seed_text = form.get("seed", "").strip()
     errors = []
     info = None
-    results = []
+    scenario_results = []
+    snapshot_diff = None
 
     if password != ADMIN_PASSWORD:
         errors.append("管理者パスワードが違います。")
-        return templates.TemplateResponse(
+        return get_templates().TemplateResponse(
             "admin.html",
             {
                 "request": request,
                 "title": "管理者ダッシュボード",
                 "messages": errors,
-                "students": [],
-                "mentors": [],
-                "results": [],
-                "is_accepting": get_status(),
+                "is_accepting": await get_status_async(),
                 "show_dashboard": False,
             },
         )
 
-    students = load_data_from_sheet("students")
-    mentors = load_data_from_sheet("mentors")
+    await run_storage_io(submission_queue.flush)
+    # One batched read for everything the dashboard needs; later status and
+    # results lookups are served from the sheet cache.
+    sheet_names = ["students", "mentors", "settings"]
+    if action == "rematch":
+        sheet_names.append("results")
+    tables = await load_data_from_sheets_async(sheet_names)
+    students, mentors = tables["students"], tables["mentors"]
 
     if action == "toggle_status":
-        current = get_status()
-        set_status(not current)
+        current = status_from_settings(tables["settings"])
+        await set_status_async(not current)
         info = "受付ステータスを変更しました。"
-    elif action == "match":
+    elif action in ("match", "rematch"):
+        previous = tables.get("results")
         if students.empty or mentors.empty:
             errors.append("生徒またはメンターのデータが不足しています。")
+        elif action == "match" and engine not in MATCHING_ENGINES:
+            errors.append("エラー: 不明なマッチング方式です。")
+        elif action == "rematch" and previous.empty:
+            errors.append("生徒・メンターまたは前回のマッチング結果が不足しています。")
+        elif seed_text and not seed_text.isdigit():
+            errors.append("エラー: シード値は0以上の整数で指定してください。")
+        else:
+            # Every run gets a seed so that it can be reproduced from its snapshot.
+            seed = int(seed_text) if seed_text else random.randrange(2 ** 31)
+            student_records = [Student.from_row(row) for row in students.rows]
+            mentor_records = [Mentor.from_row(row) for row in mentors.rows]
+            if action == "match":
+                assignments = await run_in_threadpool(
+                    run_matching, student_records, mentor_records, engine=engine, seed=seed
+                )
+                info = "マッチングを実行しました。"
+            else:
+                assignments, moved = await run_in_threadpool(
+                    run_incremental_matching, student_records, mentor_records, previous.rows, change_log.delta()
+                )
+                info = f"差分マッチングを実行しました。（既存の割り当て変更: {len(moved)}名）"
+            if improve:
+                assignments, before, after = await run_in_threadpool(
+                    run_improvement, student_records, mentor_records, assignments, seed=seed
+                )
+                info += f"（{improvement_summary(before, after)}）"
+            assignments.sort(key=lambda a: get_sort_key(a.slot or ""))
+            await save_data_to_sheet_async(table_of(assignments), "results")
+            snapshot = await run_in_threadpool(
+                save_snapshot,
+                assignments,
+                student_records,
+                mentor_records,
+                engine if action == "match" else "incremental",
+                seed,
+                improve,
+            )
+            info += f"（スナップショット: {snapshot['id']}、シード: {seed}）"
+    elif action == "snapshot_load":
+        try:
+            snapshot = await run_in_threadpool(snapshot_store.load, form.get("snapshot", ""))
+        except (KeyError, ValueError, OSError):
+            errors.append("エラー: スナップショットが見つかりません。")
+        else:
+            student_records = [Student.from_row(row) for row in students.rows]
+            mentor_records = [Mentor.from_row(row) for row in mentors.rows]
+            assignments = assignments_from_snapshot(snapshot, student_records)
+            assignments.sort(key=lambda a: get_sort_key(a.slot or ""))
+            await save_data_to_sheet_async(table_of(assignments), "results")
+            info = f"スナップショット {snapshot['id']} を復元しました（再計算なし）。"
+            if snapshot["inputs"] != input_hashes(student_records, mentor_records, TIME_SLOTS):
+                info += "※生徒・メンターの希望または日程がこの実行時から変更されています。"
+    elif action == "snapshot_diff":
+        try:
+            new = await run_in_threadpool(snapshot_store.load, form.get("snapshot", ""))
+            old = await run_in_threadpool(snapshot_store.load, form.get("compare", ""))
+        except (KeyError, ValueError, OSError):
+            errors.append("エラー: 比較するスナップショットを2つ選択してください。")
         else:
-            results = run_matching(students, mentors)
-            results = sorted(results, key=lambda x: get_sort_key(x.get("決定日時", "")))
-            info = "マッチングを実行しました。"
+            snapshot_diff = diff_snapshots(old, new)
+            info = f"スナップショット {old['id']} → {new['id']} の差分を表示しています。"
+    elif action == "scenarios":
+        try:
+            scenarios = parse_scenarios(scenarios_text)
+        except ValueError as e:
+            errors.append(f"エラー: シナリオの形式が正しくありません（{e}）")
+        else:
+            if students.empty or mentors.empty:
+                errors.append("生徒またはメンターのデータが不足しています。")
+            elif seed_text and not seed_text.isdigit():
+                errors.append("エラー: シード値は0以上の整数で指定してください。")
+            else:
+                try:
+                    scenario_results = await run_in_threadpool(
+                        run_what_if,
+                        [Student.from_row(row) for row in students.rows],
+                        [Mentor.from_row(row) for row in mentors.rows],
+                        scenarios,
+                        int(seed_text) if seed_text else None,
+                    )
+                    info = f"シナリオ比較を実行しました。（{len(scenarios)}件、シード: {scenario_results[0]['seed']}）"
+                except ValueError as e:
+                    errors.append(f"エラー: {e}")
     elif action == "clear_students":
-        save_data_to_sheet(pd.DataFrame(), "students")
+        await save_data_to_sheet_async(Table(), "students")
         info = "生徒データを削除しました。"
     elif action == "clear_mentors":
-        save_data_to_sheet(pd.DataFrame(), "mentors")
+        await save_data_to_sheet_async(Table(), "mentors")
         info = "メンターデータを削除しました。"
 
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "admin.html",
         {
             "request": request,
             "title": "管理者ダッシュボード",
             "messages": errors if errors else ([info] if info else []),
-            "students": students.to_dict("records") if not students.empty else [],
-            "mentors": mentors.to_dict("records") if not mentors.empty else [],
-            "results": results,
-            "is_accepting": get_status(),
+            "admin_token": issue_admin_token(),
+            "table_filters": admin_table_filters(),
+            "is_accepting": await get_status_async(),
             "show_dashboard": True,
+            "scenarios_text": scenarios_text,
+            **scenario_context(scenario_results),
+            "snapshots": await run_in_threadpool(snapshot_store.list),
+            "snapshot_diff": snapshot_diff,
         },
     )
+
+
+@app.post("/admin/scenarios")
+async def admin_scenarios(request: Request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "invalid JSON body"}, status_code=400)
+    if not isinstance(payload, dict) or payload.get("password") != ADMIN_PASSWORD:
+        return JSONResponse({"error": "invalid admin password"}, status_code=401)
+    try:
+        scenarios = parse_scenarios(json.dumps(payload.get("scenarios", [])))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    seed = payload.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        return JSONResponse({"error": "seed must be a non-negative integer"}, status_code=400)
+
+    await run_storage_io(submission_queue.flush)
+    tables = await load_data_from_sheets_async(["students", "mentors"])
+    try:
+        scenario_results = await run_in_threadpool(
+            run_what_if,
+            [Student.from_row(row) for row in tables["students"].rows],
+            [Mentor.from_row(row) for row in tables["mentors"].rows],
+            scenarios,
+            seed,
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"scenarios": scenario_results}
+
+
+def admin_table_filters() -> dict:
+    return {
+        "grade": GRADES,
+        "stream": ["文系", "理系", "未定"],
+        "slot": TIME_SLOTS,
+    }
+
+
+@app.get("/admin/api/{table_name}")
+async def admin_table_api(table_name: str, request: Request):
+    # Paginated rows of students, mentors or results. Filters: grade, stream,
+    # status (matched / unmatched), slot and q (name contains); sort by any
+    # column with order=asc|desc.
+    token = request.headers.get("X-Admin-Token", "")
+    if not admin_token_valid(token) and request.headers.get("X-Admin-Password") != ADMIN_PASSWORD:
+        return JSONResponse({"error": "invalid admin credentials"}, status_code=401)
+    params = request.query_params
+    try:
+        page = int(params.get("page", "1"))
+        per_page = int(params.get("per_page", str(DEFAULT_PER_PAGE)))
+    except ValueError:
+        return JSONResponse({"error": "page and per_page must be integers"}, status_code=400)
+
+    views = await run_storage_io(load_admin_views)
+    view = views.get(table_name)
+    if view is None:
+        return JSONResponse({"error": f"unknown table: {table_name}"}, status_code=404)
+    result = view.page(
+        {facet: params.get(facet) for facet in FILTERS},
+        text=params.get("q", "").strip(),
+        sort=params.get("sort"),
+        descending=params.get("order") == "desc",
+        page=page,
+        per_page=per_page,
+    )
+    result["table"] = table_name
+    result["facets"] = view.facet_counts()
+    return result
+
+
+@app.post("/admin/export")
+async def admin_export(request: Request):
+    form = await request.form()
+    if form.get("admin_password", "").strip() != ADMIN_PASSWORD:
+        return PlainTextResponse("管理者パスワードが違います。", status_code=401)
+    sheet_name = form.get("sheet", "results")
+    export_format = form.get("export_format", "csv")
+    if sheet_name not in EXPORT_SHEETS or export_format not in ("csv", "xlsx"):
+        return PlainTextResponse("エラー: 出力対象または形式が正しくありません。", status_code=400)
+
+    await run_storage_io(submission_queue.flush)
+    table = await load_data_from_sheet_async(sheet_name)
+    columns = [column for column in table.columns if column not in EXPORT_HIDDEN_COLUMNS]
+    # Rows are encoded chunk by chunk while the response is being sent.
+    if export_format == "csv":
+        body, media_type = csv_chunks(columns, iter(table.rows)), CSV_MEDIA_TYPE
+    else:
+        body, media_type = xlsx_chunks(columns, iter(table.rows), sheet_name), XLSX_MEDIA_TYPE
+    filename = f"{sheet_name}_{time.strftime('%Y%m%d_%H%M')}.{export_format}"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
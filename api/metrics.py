@@ -0,0 +1,174 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# Per-request totals by category ("sheets", "matching", ...) as
+# {category: [calls, seconds]}. The dict is shared with threads that run in a
+# copy of the request's context, so their calls are attributed too.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collect):
+        # collect() -> iterable of (name, kind, labels dict, value), read at
+        # scrape time for values owned elsewhere (cache statistics, ...)
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        samples = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples.setdefault(name, [])
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts + [histogram.count]):
+                    bucket_labels = labels + (("le", _format_number(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram.total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        kinds = {}
+        for collect in self._collectors:
+            try:
+                collected = list(collect())
+            except Exception:
+                continue
+            for name, kind, labels, value in collected:
+                kinds.setdefault(name, kind)
+                labels = tuple(sorted(labels.items()))
+                samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+
+        out = []
+        for name in sorted(samples):
+            kind, text = self._help.get(name, (kinds.get(name, "untyped"), ""))
+            if text:
+                out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            out += samples[name]
+        return "\n".join(out) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("http_request_duration_seconds", "histogram", "Request latency by route, method and status.")
+registry.describe("http_request_sheets_calls", "histogram", "Google Sheets API calls made while serving one request.")
+registry.describe("http_request_sheets_seconds", "histogram", "Time spent in Google Sheets API calls per request.")
+registry.describe("sheets_api_calls_total", "counter", "Google Sheets API calls by operation and outcome.")
+registry.describe("sheets_api_call_duration_seconds", "histogram", "Google Sheets API call latency by operation.")
+registry.describe("matching_duration_seconds", "histogram", "Matching run time by engine.")
+registry.describe("sheets_api_retries_total", "counter", "Sheets API calls retried after a 429, 5xx or connection error.")
+registry.describe("sheets_quota_tokens", "gauge", "Sheets call tokens left in the quota bucket; negative while callers are queued.")
+registry.describe("sheets_quota_wait_seconds_total", "counter", "Time spent waiting for Sheets quota.")
+registry.describe("sheet_cache_hits_total", "counter", "Sheet reads served from the TTL cache.")
+registry.describe("sheet_cache_misses_total", "counter", "Sheet reads that went to the backend.")
+registry.describe("sheet_cache_hit_ratio", "gauge", "Share of sheet reads served from the TTL cache.")
+registry.describe("sheet_cache_entries", "gauge", "Sheets currently held in the TTL cache.")
+
+
+def start_request():
+    return _request_timings.set({})
+
+
+def end_request(token) -> dict:
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def record(category: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(category, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def sheets_call(operation: str):
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.inc("sheets_api_calls_total", operation=operation, outcome=outcome)
+        registry.observe("sheets_api_call_duration_seconds", elapsed, operation=operation)
+        record("sheets", elapsed)
+
+
+@contextmanager
+def matching_timer(engine: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("matching_duration_seconds", elapsed, engine=engine)
+        record("matching", elapsed)
+
+
+def server_timing(timings: dict, total: float) -> str:
+    parts = [f'{category};dur={seconds * 1000:.1f};desc="{calls} calls"' for category, (calls, seconds) in sorted(timings.items())]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
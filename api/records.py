@@ -0,0 +1,138 @@
+from api.startup import lazy_import
+
+
+class Table:
+    # Sheet contents as plain dict rows in header order; the web app has no
+    # use for pandas.
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, rows=None, columns=None):
+        self.rows = list(rows) if rows else []
+        if columns is None:
+            columns = {}
+            for row in self.rows:
+                columns.update(dict.fromkeys(row))
+        self.columns = list(columns)
+
+    @classmethod
+    def from_values(cls, values) -> "Table":
+        # Same shape as worksheet.get_all_records(): first row is the header,
+        # numeric-looking cells become numbers and short rows are padded.
+        if not values:
+            return cls()
+        numericise_all = lazy_import("gspread.utils").numericise_all
+        header = list(values[0])
+        rows = []
+        for row in values[1:]:
+            row = numericise_all(list(row) + [""] * (len(header) - len(row)), default_blank="")
+            rows.append(dict(zip(header, row)))
+        return cls(rows, header)
+
+    @property
+    def empty(self) -> bool:
+        return not self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def copy(self) -> "Table":
+        return Table([dict(row) for row in self.rows], self.columns)
+
+    def values(self):
+        return [[row.get(column, "") for column in self.columns] for row in self.rows]
+
+    def column(self, name: str):
+        return [row.get(name, "") for row in self.rows]
+
+    def find(self, key: str, value):
+        for row in self.rows:
+            if row.get(key) == value:
+                return row
+        return None
+
+    def extended(self, rows) -> "Table":
+        rows = list(rows)
+        columns = dict.fromkeys(self.columns)
+        for row in rows:
+            columns.update(dict.fromkeys(row))
+        return Table(self.rows + rows, columns)
+
+    def upserted(self, key: str, rows) -> "Table":
+        # Same order a keyed sheet write leaves behind: a row replaces the one
+        # holding its key in place and new keys go to the end.
+        rows = list(rows)
+        latest = {row.get(key): row for row in rows}
+        merged = [latest.pop(row.get(key)) if row.get(key) in latest else row for row in self.rows]
+        columns = dict.fromkeys(self.columns)
+        for row in rows:
+            columns.update(dict.fromkeys(row))
+        return Table(merged + list(latest.values()), columns)
+
+    def deduplicated(self, key: str) -> "Table":
+        last = {row.get(key): pos for pos, row in enumerate(self.rows)}
+        return Table([row for pos, row in enumerate(self.rows) if last[row.get(key)] == pos], self.columns)
+
+
+class Record:
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *values):
+        for (attr, _), value in zip(self.FIELDS, values):
+            setattr(self, attr, value)
+
+    @classmethod
+    def from_row(cls, row: dict):
+        return cls(*(row.get(column, "") for _, column in cls.FIELDS))
+
+    def to_row(self) -> dict:
+        return {column: getattr(self, attr) for attr, column in self.FIELDS}
+
+
+class Student(Record):
+    FIELDS = (
+        ("name", "生徒氏名"),
+        ("line_name", "LINE名"),
+        ("school", "学校"),
+        ("grade", "学年"),
+        ("stream", "文理"),
+        ("request_mentor", "指名希望"),
+        ("questions", "質問内容"),
+        ("slots", "可能日時"),
+    )
+    __slots__ = tuple(attr for attr, _ in FIELDS)
+
+
+class Mentor(Record):
+    FIELDS = (
+        ("name", "メンター氏名"),
+        ("stream", "文理"),
+        ("slots", "可能日時"),
+        ("password", "パスワード"),
+    )
+    __slots__ = tuple(attr for attr, _ in FIELDS)
+
+
+class Assignment:
+    __slots__ = ("student", "mentor", "slot")
+
+    def __init__(self, student: Student, mentor=None, slot=None):
+        self.student = student
+        self.mentor = mentor
+        self.slot = slot
+
+    def to_row(self) -> dict:
+        decided = bool(self.mentor)
+        return {
+            "生徒氏名": self.student.name,
+            "決定メンター": self.mentor if decided else "",
+            "決定日時": self.slot if decided else "",
+            "ステータス": "決定" if decided else "未定(空きなし)",
+            "学校": self.student.school,
+            "学年": self.student.grade,
+            "生徒文理": self.student.stream,
+        }
+
+
+def table_of(records) -> Table:
+    return Table([record.to_row() for record in records])
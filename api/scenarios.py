@@ -0,0 +1,146 @@
+import functools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from api.engines import ENGINES
+
+BASELINE_NAME = "現状"
+LIST_FIELDS = ("remove_mentors", "remove_students", "close_slots", "close_days")
+SCENARIO_FIELDS = ("name", "engine") + LIST_FIELDS
+
+# Set once per worker process by the pool initializer and only read
+# afterwards, so the catalog and availability masks are pickled once per
+# worker instead of once per scenario.
+_shared = {}
+
+
+def _init_worker(catalog, students, mentors):
+    # students / mentors: (names, slot masks, stream masks)
+    _shared["catalog"] = catalog
+    _shared["students"] = students
+    _shared["mentors"] = mentors
+
+
+def evaluate_scenario(scenario: dict, seed=None) -> dict:
+    # scenario keys, all optional:
+    #   name, engine, remove_mentors, remove_students, close_slots, close_days
+    catalog = _shared["catalog"]
+    s_names, s_masks, s_streams = _shared["students"]
+    m_names, m_free, m_streams = _shared["mentors"]
+
+    closed = catalog.mask_of(scenario.get("close_slots", []))
+    close_days = set(scenario.get("close_days", []))
+    for slot_id, day_id in enumerate(catalog.day_index):
+        if catalog.days[day_id] in close_days:
+            closed |= 1 << slot_id
+    open_mask = catalog.all_mask & ~closed
+    removed_students = set(scenario.get("remove_students", []))
+    removed_mentors = set(scenario.get("remove_mentors", []))
+
+    kept = [i for i, s_name in enumerate(s_names) if s_name not in removed_students]
+    kept.sort(key=lambda i: bin(s_masks[i] & open_mask).count("1"))
+    mentor_free = [0 if m_name in removed_mentors else free & open_mask for m_name, free in zip(m_names, m_free)]
+
+    engine = scenario.get("engine", "greedy")
+    started = time.perf_counter()
+    assignments = ENGINES[engine](
+        catalog,
+        [s_masks[i] & open_mask for i in kept],
+        [s_streams[i] for i in kept],
+        mentor_free,
+        m_streams,
+        seed=seed,
+    )
+    elapsed = time.perf_counter() - started
+
+    load = {m_name: 0 for m_name in m_names if m_name not in removed_mentors}
+    unmatched = []
+    for i, pair in zip(kept, assignments):
+        if pair is None:
+            unmatched.append(s_names[i])
+        else:
+            load[m_names[pair[0]]] += 1
+    return {
+        "name": scenario.get("name", ""),
+        "engine": engine,
+        "students": len(kept),
+        "matched": len(kept) - len(unmatched),
+        "unmatched": unmatched,
+        "mentor_load": load,
+        "seed": seed,
+        "seconds": round(elapsed, 3),
+    }
+
+
+def validate_scenario(scenario, known=None):
+    # A misspelt key or a bare string where a list is expected would
+    # otherwise change nothing (or remove single characters) and still
+    # produce a plausible-looking comparison, so both are rejected.
+    # known: field -> accepted values, checked when given.
+    if not isinstance(scenario, dict):
+        raise ValueError("each scenario must be an object")
+    unknown = [key for key in scenario if key not in SCENARIO_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown scenario keys: {', '.join(map(str, unknown))}")
+    for field in ("name", "engine"):
+        if field in scenario and not isinstance(scenario[field], str):
+            raise ValueError(f"{field} must be a string")
+    if scenario.get("engine", "greedy") not in ENGINES:
+        raise ValueError(f"Unknown matching engine: {scenario['engine']}")
+    for field in LIST_FIELDS:
+        values = scenario.get(field, [])
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"{field} must be a list of strings")
+        if known is not None and field in known:
+            missing = [value for value in values if value not in known[field]]
+            if missing:
+                raise ValueError(f"{field}: not found: {', '.join(missing)}")
+
+
+def pool_context():
+    # Workers are started fresh rather than forked: the caller runs inside a
+    # threaded server, and a fork copies whatever locks other threads hold.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def run_scenarios(catalog, students, mentors, scenarios, seed=None, max_workers=None):
+    # Evaluates the unchanged data with every engine the scenarios use, then
+    # every scenario, all with the same seed so that differences come from the
+    # scenario rather than tie-breaking. Falls back to running in-process
+    # where worker processes are unavailable (e.g. no /dev/shm).
+    known = {
+        "remove_students": set(students[0]),
+        "remove_mentors": set(mentors[0]),
+        "close_slots": set(catalog.labels),
+        "close_days": set(catalog.days),
+    }
+    for scenario in scenarios:
+        validate_scenario(scenario, known)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    engines = list(dict.fromkeys(scenario.get("engine", "greedy") for scenario in scenarios)) or ["greedy"]
+    baselines = [
+        {"name": BASELINE_NAME if len(engines) == 1 else f"{BASELINE_NAME}（{engine}）", "engine": engine}
+        for engine in engines
+    ]
+    jobs = baselines + list(scenarios)
+    evaluate = functools.partial(evaluate_scenario, seed=seed)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if max_workers > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=pool_context(),
+                initializer=_init_worker,
+                initargs=(catalog, students, mentors),
+            ) as pool:
+                return list(pool.map(evaluate, jobs))
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            pass
+    _init_worker(catalog, students, mentors)
+    return [evaluate(job) for job in jobs]
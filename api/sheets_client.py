@@ -0,0 +1,152 @@
+import contextvars
+import os
+import random
+import threading
+import time
+
+from api.metrics import registry, sheets_call
+from api.startup import lazy_import
+
+QUOTA_PER_MINUTE = float(os.environ.get("SHEETS_QUOTA_PER_MINUTE", "60"))
+QUOTA_BURST = int(os.environ.get("SHEETS_QUOTA_BURST", "10"))
+MAX_QUOTA_WAIT = float(os.environ.get("SHEETS_MAX_QUOTA_WAIT", "20"))
+MAX_RETRIES = int(os.environ.get("SHEETS_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.environ.get("SHEETS_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.environ.get("SHEETS_BACKOFF_CAP", "16"))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Sheets calls left for the current request, as a one-element list so
+# storage threads running in a copy of the request context share it.
+_budget = contextvars.ContextVar("sheets_call_budget", default=None)
+
+
+class SheetsUnavailable(RuntimeError):
+    pass
+
+
+class CallBudgetExceeded(SheetsUnavailable):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Takes a token, possibly going negative; returns how long the caller
+        # has to wait for it. Reservations queue up fairly in arrival order.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return wait
+
+    def _release(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def acquire(self, max_wait: float):
+        if self.rate <= 0:
+            return
+        wait = self._reserve()
+        if wait > max_wait:
+            self._release()
+            raise SheetsUnavailable(f"Sheets quota exhausted: next call slot in {wait:.1f}s")
+        if wait > 0:
+            self.waited += wait
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "per_minute": self.rate * 60,
+                "burst": self.capacity,
+                "tokens": round(self.tokens, 2),
+                "waited_seconds": round(self.waited, 3),
+            }
+
+
+bucket = TokenBucket(QUOTA_PER_MINUTE, QUOTA_BURST)
+
+
+def collect_metrics():
+    stats = bucket.stats()
+    yield "sheets_quota_tokens", "gauge", {}, stats["tokens"]
+    yield "sheets_quota_wait_seconds_total", "counter", {}, stats["waited_seconds"]
+
+
+def start_budget(calls: int):
+    return _budget.set([calls] if calls > 0 else None)
+
+
+def end_budget(token):
+    _budget.reset(token)
+
+
+def spend_budget():
+    remaining = _budget.get()
+    if remaining is None:
+        return
+    if remaining[0] <= 0:
+        raise CallBudgetExceeded("Sheets call budget for this request is used up")
+    remaining[0] -= 1
+
+
+def backoff_delay(attempt: int, retry_after=None) -> float:
+    # Full jitter: anywhere between 0 and the exponential ceiling, so retries
+    # from concurrent requests spread out instead of arriving together.
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def sheets_operation(method: str, endpoint: str) -> str:
+    # Ranges are URL-quoted, so a literal ":" only introduces an API action
+    # such as values:batchGet, :clear, :append or :batchUpdate.
+    path = endpoint.split("?", 1)[0]
+    tail = path.rsplit("/", 1)[-1]
+    action = tail.rsplit(":", 1)[1] if ":" in tail else {"put": "update"}.get(method.lower(), method.lower())
+    return f"values.{action}" if "/values" in path else action if ":" in tail else "metadata"
+
+
+def quota_http_client():
+    # Every Sheets API request goes through the token bucket and the
+    # request's call budget; 429 and 5xx answers and connection errors are
+    # retried with jittered exponential backoff before the error is raised.
+    gspread = lazy_import("gspread")
+    requests = lazy_import("requests")
+
+    class QuotaHTTPClient(gspread.http_client.HTTPClient):
+        def request(self, method, endpoint, *args, **kwargs):
+            operation = sheets_operation(method, endpoint)
+            for attempt in range(MAX_RETRIES + 1):
+                spend_budget()
+                bucket.acquire(MAX_QUOTA_WAIT)
+                try:
+                    with sheets_call(operation):
+                        return super().request(method, endpoint, *args, **kwargs)
+                except gspread.exceptions.APIError as e:
+                    response = getattr(e, "response", None)
+                    status = getattr(response, "status_code", None)
+                    if status not in RETRYABLE_STATUS or attempt == MAX_RETRIES:
+                        raise
+                    delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt == MAX_RETRIES:
+                        raise
+                    status = "connection"
+                    delay = backoff_delay(attempt)
+                registry.inc("sheets_api_retries_total", operation=operation, status=status)
+                time.sleep(delay)
+
+    return QuotaHTTPClient
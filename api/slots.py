@@ -0,0 +1,101 @@
+STREAM_BITS = {"文系": 1, "理系": 2}
+ALL_STREAMS = 3
+
+
+def stream_mask(value) -> int:
+    if not value:
+        return 0
+    mask = 0
+    for part in str(value).split(","):
+        part = part.strip()
+        if part == "未定":
+            return ALL_STREAMS
+        mask |= STREAM_BITS.get(part, 0)
+    return mask
+
+
+def iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SlotCatalog:
+    def __init__(self, labels):
+        self.labels = tuple(labels)
+        self.ids = {label: i for i, label in enumerate(self.labels)}
+        self.size = len(self.labels)
+        self.all_mask = (1 << self.size) - 1
+
+        # Per-slot metadata indexed by slot id: the day it falls on and the
+        # slots on the same day whose time ranges touch it, so that neither
+        # scoring nor the engines ever parse labels or scan TIME_SLOTS.
+        day_of = []
+        span_of = []
+        for label in self.labels:
+            day, _, span = label.partition(" ")
+            start, _, end = span.partition("-")
+            day_of.append(day)
+            span_of.append((start, end))
+        self.days = tuple(dict.fromkeys(day_of))
+        day_ids = {day: d for d, day in enumerate(self.days)}
+        self.day_index = [day_ids[day] for day in day_of]
+
+        day_mask_by_id = [0] * len(self.days)
+        for i, d in enumerate(self.day_index):
+            day_mask_by_id[d] |= 1 << i
+        self.day_masks = [day_mask_by_id[d] for d in self.day_index]
+
+        starting_at = {(day, start): i for i, (day, (start, _)) in enumerate(zip(day_of, span_of))}
+        self.neighbours = [[] for _ in range(self.size)]
+        for i, (day, (_, end)) in enumerate(zip(day_of, span_of)):
+            j = starting_at.get((day, end))
+            if end and j is not None and j != i:
+                self.neighbours[i].append(j)
+                self.neighbours[j].append(i)
+        self.neighbours = [tuple(sorted(ids)) for ids in self.neighbours]
+        self.adjacent_masks = [sum(1 << j for j in ids) for ids in self.neighbours]
+
+    def mask_of(self, labels) -> int:
+        mask = 0
+        for label in labels:
+            i = self.ids.get(str(label).strip())
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def mask_of_cell(self, value) -> int:
+        if not value:
+            return 0
+        return self.mask_of(str(value).split(","))
+
+    def labels_of(self, mask: int):
+        return [self.labels[i] for i in iter_bits(mask)]
+
+
+class FreeMentorIndex:
+    def __init__(self, size: int):
+        self.any = [set() for _ in range(size)]
+        self.by_stream = {bit: [set() for _ in range(size)] for bit in STREAM_BITS.values()}
+
+    def add(self, m_idx: int, free: int, streams: int):
+        for slot_id in iter_bits(free):
+            self.any[slot_id].add(m_idx)
+            for bit, buckets in self.by_stream.items():
+                if streams & bit:
+                    buckets[slot_id].add(m_idx)
+
+    def remove(self, m_idx: int, slot_id: int):
+        self.any[slot_id].discard(m_idx)
+        for buckets in self.by_stream.values():
+            buckets[slot_id].discard(m_idx)
+
+    def candidates(self, slot_id: int, s_stream_mask: int):
+        if s_stream_mask == ALL_STREAMS:
+            return self.any[slot_id]
+        found = set()
+        for bit, buckets in self.by_stream.items():
+            if s_stream_mask & bit:
+                found |= buckets[slot_id]
+        return found
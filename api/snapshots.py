@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "/tmp/scheduling_app_snapshots")
+SNAPSHOT_LIMIT = int(os.environ.get("SNAPSHOT_LIMIT", "50"))
+
+
+def input_hash(records, fields) -> str:
+    # Order-independent hash of the fields that influence matching.
+    rows = sorted(json.dumps([str(getattr(record, field)) for field in fields], ensure_ascii=False) for record in records)
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()[:16]
+
+
+def input_hashes(students, mentors, calendar_labels) -> dict:
+    return {
+        "students": input_hash(students, ("name", "stream", "slots")),
+        "mentors": input_hash(mentors, ("name", "stream", "slots")),
+        "calendar": hashlib.sha256("\n".join(calendar_labels).encode("utf-8")).hexdigest()[:16],
+    }
+
+
+def make_snapshot(assignments, engine: str, seed, inputs: dict, improved: bool = False) -> dict:
+    # Assignments are kept as [student, mentor, slot] with "" for unplaced
+    # students; everything else in the results sheet is re-derived on load.
+    pairs = [[a.student.name, a.mentor or "", a.slot or ""] for a in assignments]
+    created = time.time()
+    # ids sort chronologically (to the millisecond) and stay file-name safe
+    snapshot_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(created))
+    snapshot_id += f"-{int(created * 1000) % 1000:03d}{secrets.token_hex(2)}"
+    return {
+        "version": SNAPSHOT_VERSION,
+        "id": snapshot_id,
+        "created": created,
+        "engine": engine,
+        "seed": seed,
+        "improved": improved,
+        "inputs": inputs,
+        "students": len(pairs),
+        "matched": sum(1 for pair in pairs if pair[1]),
+        "assignments": pairs,
+    }
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    before = {name: (mentor, slot) for name, mentor, slot in old["assignments"]}
+    after = {name: (mentor, slot) for name, mentor, slot in new["assignments"]}
+    moved, placed, unplaced = [], [], []
+    for name in after.keys() & before.keys():
+        old_pair, new_pair = before[name], after[name]
+        if old_pair == new_pair:
+            continue
+        if old_pair[0] and new_pair[0]:
+            moved.append({"name": name, "before": list(old_pair), "after": list(new_pair)})
+        elif new_pair[0]:
+            placed.append({"name": name, "after": list(new_pair)})
+        else:
+            unplaced.append({"name": name, "before": list(old_pair)})
+    key = lambda change: change["name"]
+    return {
+        "old": old["id"],
+        "new": new["id"],
+        "moved": sorted(moved, key=key),
+        "placed": sorted(placed, key=key),
+        "unplaced": sorted(unplaced, key=key),
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+        "unchanged": sum(1 for name in after.keys() & before.keys() if before[name] == after[name]),
+    }
+
+
+class SnapshotStore:
+    # One gzipped JSON file per run plus a small summary file for listing;
+    # the newest `limit` runs are kept.
+    def __init__(self, directory: str = SNAPSHOT_DIR, limit: int = SNAPSHOT_LIMIT):
+        self.directory = Path(directory)
+        self.limit = limit
+
+    def _path(self, snapshot_id: str, suffix: str = ".json.gz") -> Path:
+        if not snapshot_id or any(ch not in "0123456789abcdef-" for ch in snapshot_id):
+            raise KeyError(snapshot_id)
+        return self.directory / f"{snapshot_id}{suffix}"
+
+    def _ids(self):
+        if not self.directory.exists():
+            return []
+        return sorted((path.name[: -len(".meta.json")] for path in self.directory.glob("*.meta.json")), reverse=True)
+
+    def save(self, snapshot: dict) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        snapshot_id = snapshot["id"]
+        path = self._path(snapshot_id)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        summary = {key: value for key, value in snapshot.items() if key != "assignments"}
+        self._path(snapshot_id, ".meta.json").write_text(json.dumps(summary, ensure_ascii=False), encoding="utf-8")
+        for old_id in self._ids()[self.limit:]:
+            self._path(old_id, ".meta.json").unlink(missing_ok=True)
+            self._path(old_id).unlink(missing_ok=True)
+        return snapshot_id
+
+    def load(self, snapshot_id: str) -> dict:
+        path = self._path(snapshot_id)
+        if not path.exists():
+            raise KeyError(snapshot_id)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {snapshot.get('version')}")
+        return snapshot
+
+    def list(self):
+        # Summaries only, newest first.
+        summaries = []
+        for snapshot_id in self._ids():
+            try:
+                summaries.append(json.loads(self._path(snapshot_id, ".meta.json").read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return summaries
@@ -0,0 +1,35 @@
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+PROCESS_STARTED = time.time()
+IMPORT_TIMINGS = {}
+
+
+@contextmanager
+def timed_import(name: str):
+    start = time.perf_counter()
+    yield
+    IMPORT_TIMINGS.setdefault(name, round(time.perf_counter() - start, 4))
+
+
+def lazy_import(module_name: str):
+    # Heavy optional dependencies (gspread, google-auth, jinja2, pandas) are
+    # imported on first use so that cold starts only pay for what a request
+    # actually touches. The first import of each module is timed for /_diag.
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with timed_import(module_name):
+        return importlib.import_module(module_name)
+
+
+def startup_report() -> dict:
+    loaded = [name for name in ("gspread", "google.auth", "jinja2", "pandas") if name in sys.modules]
+    return {
+        "process_started": PROCESS_STARTED,
+        "uptime": round(time.time() - PROCESS_STARTED, 3),
+        "imports": dict(IMPORT_TIMINGS),
+        "heavy_modules_loaded": loaded,
+    }
@@ -0,0 +1,605 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from api.auth_cache import AUTH_CACHE_PATH, AuthCache, fingerprint_of, open_spreadsheet, service_account_credentials
+from api.cache import TTLCache
+from api.sheets_client import SheetsUnavailable, quota_http_client
+from api.records import Table
+from api.startup import lazy_import
+
+KEY_COLUMNS = {"students": "生徒氏名", "mentors": "メンター氏名"}
+SLOT_COLUMN = "可能日時"
+
+
+@lru_cache()
+def get_spreadsheet():
+    gcp_json = os.environ.get("GCP_SERVICE_ACCOUNT_JSON")
+    spreadsheet_url = os.environ.get("SPREADSHEET_URL")
+    if not gcp_json or not spreadsheet_url:
+        raise RuntimeError("Missing GCP_SERVICE_ACCOUNT_JSON or SPREADSHEET_URL environment variable")
+
+    credentials_json = json.loads(gcp_json)
+    if "private_key" in credentials_json:
+        credentials_json["private_key"] = credentials_json["private_key"].replace("\\n", "\n")
+
+    # Token, spreadsheet and worksheet metadata are reused from /tmp across
+    # invocations until the token expires or a worksheet lookup misses.
+    auth_cache = AuthCache(AUTH_CACHE_PATH, fingerprint_of(gcp_json, spreadsheet_url))
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = service_account_credentials(credentials_json, scope, auth_cache)
+    client = lazy_import("gspread").authorize(creds, http_client=quota_http_client())
+    return open_spreadsheet(client, spreadsheet_url, auth_cache)
+
+
+def normalize_table(table: Table) -> Table:
+    rows = []
+    for row in table.rows:
+        row = {column: "" if row.get(column) is None else row[column] for column in table.columns}
+        if "パスワード" in row:
+            row["パスワード"] = str(row["パスワード"])
+        rows.append(row)
+    return Table(rows, table.columns)
+
+
+def unavailable(error: Exception, sheet_name: str) -> SheetsUnavailable:
+    if isinstance(error, SheetsUnavailable):
+        return error
+    return SheetsUnavailable(f"Failed to read {sheet_name} from Google Sheets: {error}")
+
+
+class StorageBackend:
+    name = "base"
+
+    def load(self, sheet_name: str) -> Table:
+        raise NotImplementedError
+
+    def save(self, table: Table, sheet_name: str):
+        raise NotImplementedError
+
+    def append(self, table: Table, sheet_name: str):
+        raise NotImplementedError
+
+    def upsert(self, row: dict, sheet_name: str) -> bool:
+        raise NotImplementedError
+
+    def upsert_many(self, rows, sheet_name: str):
+        return [self.upsert(row, sheet_name) for row in rows]
+
+    def load_many(self, sheet_names):
+        return {sheet_name: self.load(sheet_name) for sheet_name in sheet_names}
+
+    def slot_postings(self, sheet_name: str):
+        # {slot label: [names]} from a maintained index, or None when the
+        # backend keeps none and callers should split the slot cells.
+        return None
+
+    def known_key(self, sheet_name: str, name) -> bool:
+        # Whether a row for `name` is known to exist; backends with remote
+        # storage answer from what they already hold instead of reading.
+        return self.load(sheet_name).find(KEY_COLUMNS[sheet_name], name) is not None
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    def collect_metrics(self):
+        return ()
+
+
+class SheetsBackend(StorageBackend):
+    name = "sheets"
+
+    def __init__(self, spreadsheet_factory=get_spreadsheet, cache_ttl: float = 15):
+        self.spreadsheet_factory = spreadsheet_factory
+        self.cache = TTLCache(cache_ttl)
+        self.row_indexes = {}
+        self._worksheets = None
+        self._write_lock = threading.RLock()
+
+    def _worksheet_handles(self) -> dict:
+        # One metadata call lists every worksheet; handles are reused until a
+        # lookup misses or a call fails.
+        if self._worksheets is None:
+            sh = self.spreadsheet_factory()
+            self._worksheets = {ws.title: ws for ws in sh.worksheets()}
+        return self._worksheets
+
+    def _worksheet(self, sheet_name: str, create: bool = False):
+        worksheet = self._worksheet_handles().get(sheet_name)
+        if worksheet is not None:
+            return worksheet
+        self._worksheets = None
+        worksheet = self._worksheet_handles().get(sheet_name)
+        if worksheet is not None:
+            return worksheet
+        if not create:
+            raise LookupError(f"Worksheet not found: {sheet_name}")
+        worksheet = self.spreadsheet_factory().add_worksheet(title=sheet_name, rows=100, cols=20)
+        self._worksheets[sheet_name] = worksheet
+        return worksheet
+
+    def _index_rows(self, sheet_name: str, table: Table) -> Table:
+        # Remember which sheet row holds each key so upserts can address it
+        # directly. Row 1 is the header; a repeated key resolves to its last row.
+        key = KEY_COLUMNS.get(sheet_name)
+        if key is None:
+            return table
+        index = {}
+        if key in table.columns:
+            for pos, value in enumerate(table.column(key)):
+                index[value] = pos + 2
+            table = table.deduplicated(key)
+        self.row_indexes[sheet_name] = (list(table.columns), index)
+        return table
+
+    def load(self, sheet_name: str) -> Table:
+        # A sheet that does not exist yet reads as empty; any other failure
+        # is raised so callers never mistake a throttled read for no data.
+        cached = self.cache.get(sheet_name)
+        if cached is not None:
+            return cached.copy()
+        try:
+            worksheet = self._worksheet(sheet_name)
+            values = worksheet.get_all_values()
+        except LookupError:
+            self.cache.put(sheet_name, Table())
+            return Table()
+        except Exception as e:
+            self._worksheets = None
+            raise unavailable(e, sheet_name) from e
+        table = self._index_rows(sheet_name, normalize_table(Table.from_values(values)))
+        self.cache.put(sheet_name, table)
+        return table.copy()
+
+    def known_key(self, sheet_name: str, name) -> bool:
+        return name in self.row_indexes.get(sheet_name, ((), {}))[1]
+
+    def load_many(self, sheet_names):
+        # Cache misses are fetched together with one values:batchGet call.
+        tables = {}
+        missing = []
+        for sheet_name in sheet_names:
+            cached = self.cache.get(sheet_name)
+            if cached is not None:
+                tables[sheet_name] = cached.copy()
+            else:
+                missing.append(sheet_name)
+        if not missing:
+            return tables
+        try:
+            handles = self._worksheet_handles()
+            if any(sheet_name not in handles for sheet_name in missing):
+                # the sheet may have been created since the handles were listed
+                self._worksheets = None
+                handles = self._worksheet_handles()
+            present = [sheet_name for sheet_name in missing if sheet_name in handles]
+            value_ranges = []
+            if present:
+                quoted = ["'" + sheet_name.replace("'", "''") + "'" for sheet_name in present]
+                response = self.spreadsheet_factory().values_batch_get(quoted)
+                value_ranges = response.get("valueRanges", [])
+            for sheet_name, value_range in zip(present, value_ranges):
+                table = self._index_rows(sheet_name, normalize_table(Table.from_values(value_range.get("values", []))))
+                self.cache.put(sheet_name, table)
+                tables[sheet_name] = table.copy()
+            for sheet_name in missing:
+                if sheet_name not in handles:
+                    self.cache.put(sheet_name, Table())
+                    tables[sheet_name] = Table()
+        except Exception as e:
+            self._worksheets = None
+            raise unavailable(e, ", ".join(missing)) from e
+        return tables
+
+    def save(self, table: Table, sheet_name: str):
+        with self._write_lock:
+            self._save(table, sheet_name)
+
+    def _save(self, table: Table, sheet_name: str):
+        worksheet = self._worksheet(sheet_name, create=True)
+        table = normalize_table(table)
+        self.cache.invalidate(sheet_name)
+        self.row_indexes.pop(sheet_name, None)
+        worksheet.clear()
+        if not table.empty:
+            worksheet.update([table.columns] + table.values())
+        self.cache.put(sheet_name, self._index_rows(sheet_name, table))
+
+    def append(self, table: Table, sheet_name: str):
+        with self._write_lock:
+            worksheet = self._worksheet(sheet_name, create=True)
+            table = normalize_table(table)
+            self.cache.invalidate(sheet_name)
+            self.row_indexes.pop(sheet_name, None)
+            existing_data = worksheet.get_all_values()
+            if not existing_data:
+                worksheet.update([table.columns] + table.values())
+            else:
+                worksheet.append_rows(table.values())
+
+    def upsert(self, row: dict, sheet_name: str) -> bool:
+        return self.upsert_many([row], sheet_name)[0]
+
+    def upsert_many(self, rows, sheet_name: str):
+        # Writes keyed rows with at most two API calls: one batch update of
+        # the rows the keys already occupy and one append for new keys.
+        # Returns, per input row, whether its key already existed.
+        with self._write_lock:
+            return self._upsert_many(rows, sheet_name)
+
+    def _fresh_index(self, worksheet, sheet_name: str, key: str):
+        # Checks the cached row index with one small read of the header row
+        # and the key column. Returns (header, index), or None when there is
+        # no cached header or the header changed, which calls for a full read.
+        header, _ = self.row_indexes.get(sheet_name, ([], {}))
+        if key not in header:
+            return None
+        utils = lazy_import("gspread.utils")
+        letter = "".join(ch for ch in utils.rowcol_to_a1(1, header.index(key) + 1) if ch.isalpha())
+        header_range, key_range = worksheet.batch_get(["1:1", f"{letter}:{letter}"])
+        if not header_range or list(header_range[0]) != header:
+            return None
+        names = utils.numericise_all([row[0] if row else "" for row in key_range[1:]], default_blank="")
+        return header, {name: pos + 2 for pos, name in enumerate(names)}
+
+    def _upsert_many(self, rows, sheet_name: str):
+        # Row numbers are re-checked against the sheet before every write:
+        # another instance may have cleared, rewritten or appended to it since
+        # they were cached, and a stale index would overwrite the wrong row.
+        # That costs one header + key column read; the full sheet is read
+        # only when there is nothing cached or the header changed.
+        key = KEY_COLUMNS[sheet_name]
+        latest = {row[key]: row for row in rows}
+        worksheet = self._worksheet(sheet_name, create=True)
+        fresh = self._fresh_index(worksheet, sheet_name, key)
+        if fresh is not None:
+            header, index = fresh
+            table = self.cache.get(sheet_name)
+            if table is not None and table.column(key) != list(index):
+                table = None
+        if fresh is None or (table is None and any(column not in header for row in rows for column in row)):
+            self.cache.invalidate(sheet_name)
+            self.row_indexes.pop(sheet_name, None)
+            table = self.load(sheet_name)
+            header, index = self.row_indexes.get(sheet_name, ([], {}))
+        existed = [row[key] in index for row in rows]
+        if header and any(column not in header for row in rows for column in row):
+            self._save(table.upserted(key, latest.values()), sheet_name)
+            return existed
+
+        self.cache.invalidate(sheet_name)
+
+        if not header:
+            header = []
+            for row in latest.values():
+                header += [column for column in row if column not in header]
+            values = [[row.get(column, "") for column in header] for row in latest.values()]
+            worksheet.update(range_name="A1", values=[header] + values)
+            index = {name: pos + 2 for pos, name in enumerate(latest)}
+        else:
+            updates = [
+                {"range": f"A{index[name]}", "values": [[row.get(column, "") for column in header]]}
+                for name, row in latest.items()
+                if name in index
+            ]
+            appended = [name for name in latest if name not in index]
+            if updates:
+                worksheet.batch_update(updates)
+            if appended:
+                response = worksheet.append_rows(
+                    [[latest[name].get(column, "") for column in header] for name in appended],
+                    table_range="A1",
+                )
+                updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+                digits = "".join(ch for ch in updated_range.split("!")[-1].split(":")[0] if ch.isdigit())
+                if not digits:
+                    self.row_indexes.pop(sheet_name, None)
+                    return existed
+                for offset, name in enumerate(appended):
+                    index[name] = int(digits) + offset
+
+        self.row_indexes[sheet_name] = (header, index)
+        if table is not None:
+            new_rows = [{column: row.get(column, "") for column in header} for row in latest.values()]
+            self.cache.put(sheet_name, normalize_table(table.upserted(key, new_rows)))
+        return existed
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "sheet_cache": self.cache.stats()}
+
+    def collect_metrics(self):
+        stats = self.cache.stats()
+        yield "sheet_cache_hits_total", "counter", {}, stats["hits"]
+        yield "sheet_cache_misses_total", "counter", {}, stats["misses"]
+        yield "sheet_cache_hit_ratio", "gauge", {}, stats["hit_rate"]
+        yield "sheet_cache_entries", "gauge", {}, stats["entries"]
+
+
+class MemoryBackend(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def load(self, sheet_name: str) -> Table:
+        with self._lock:
+            table = self.tables.get(sheet_name)
+            return table.copy() if table is not None else Table()
+
+    def save(self, table: Table, sheet_name: str):
+        with self._lock:
+            self.tables[sheet_name] = normalize_table(table)
+
+    def append(self, table: Table, sheet_name: str):
+        with self._lock:
+            current = self.tables.get(sheet_name, Table())
+            self.tables[sheet_name] = normalize_table(current.extended(table.rows))
+
+    def upsert(self, row: dict, sheet_name: str) -> bool:
+        # Like the Sheets and SQLite backends: the row replaces the stored one
+        # in place (columns it lacks read back empty) and new keys go last.
+        key = KEY_COLUMNS[sheet_name]
+        with self._lock:
+            table = self.tables.get(sheet_name, Table())
+            existed = table.find(key, row[key]) is not None
+            self.tables[sheet_name] = normalize_table(table.upserted(key, [dict(row)]))
+            return existed
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    # on_write(sheet_name, names) is called after each write; names lists the
+    # keys an upsert touched and is None when the whole sheet was replaced.
+    # seed_from: backend whose copy of a sheet is loaded the first time this
+    # database touches that sheet, so a fresh file starts from the real data.
+    def __init__(self, path: str, on_write=None, seed_from=None):
+        self.path = path
+        self.on_write = on_write
+        self.seed_from = seed_from
+        self._seeded = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sheet_columns (
+                sheet TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (sheet, position)
+            );
+            CREATE TABLE IF NOT EXISTS sheet_rows (
+                row_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sheet TEXT NOT NULL,
+                name TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sheet_rows_sheet ON sheet_rows (sheet, row_id);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_sheet_rows_name ON sheet_rows (sheet, name) WHERE name IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS row_slots (
+                sheet TEXT NOT NULL,
+                name TEXT NOT NULL,
+                slot TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_row_slots_slot ON row_slots (sheet, slot);
+            CREATE INDEX IF NOT EXISTS idx_row_slots_name ON row_slots (sheet, name);
+            CREATE TABLE IF NOT EXISTS seeded_sheets (sheet TEXT PRIMARY KEY);
+            """
+        )
+        with self._conn:
+            # databases written before the slot index existed
+            if self._conn.execute("SELECT 1 FROM row_slots LIMIT 1").fetchone() is None:
+                cur = self._conn.execute("SELECT sheet, name, data FROM sheet_rows WHERE name IS NOT NULL")
+                for sheet_name, name, data in cur.fetchall():
+                    self._index_slots(sheet_name, name, json.loads(data))
+
+    def _columns(self, sheet_name: str):
+        cur = self._conn.execute("SELECT name FROM sheet_columns WHERE sheet = ? ORDER BY position", (sheet_name,))
+        return [name for (name,) in cur]
+
+    def _set_columns(self, sheet_name: str, columns):
+        self._conn.execute("DELETE FROM sheet_columns WHERE sheet = ?", (sheet_name,))
+        self._conn.executemany(
+            "INSERT INTO sheet_columns (sheet, position, name) VALUES (?, ?, ?)",
+            [(sheet_name, pos, name) for pos, name in enumerate(columns)],
+        )
+
+    def _insert_rows(self, sheet_name: str, records):
+        key = KEY_COLUMNS.get(sheet_name)
+        for record in records:
+            name = str(record[key]) if key and key in record else None
+            if name is not None:
+                self._conn.execute("DELETE FROM sheet_rows WHERE sheet = ? AND name = ?", (sheet_name, name))
+            self._conn.execute(
+                "INSERT INTO sheet_rows (sheet, name, data) VALUES (?, ?, ?)",
+                (sheet_name, name, json.dumps(record, ensure_ascii=False)),
+            )
+            if name is not None:
+                self._index_slots(sheet_name, name, record)
+
+    def _index_slots(self, sheet_name: str, name: str, record: dict):
+        self._conn.execute("DELETE FROM row_slots WHERE sheet = ? AND name = ?", (sheet_name, name))
+        slots = [slot.strip() for slot in str(record.get(SLOT_COLUMN) or "").split(",") if slot.strip()]
+        self._conn.executemany(
+            "INSERT INTO row_slots (sheet, name, slot) VALUES (?, ?, ?)",
+            [(sheet_name, name, slot) for slot in slots],
+        )
+
+    def _written(self, sheet_name: str, names=None):
+        if self.on_write is not None:
+            self.on_write(sheet_name, names)
+
+    def _seed(self, sheet_name: str, replacing: bool = False):
+        # Once per database file and sheet; a failed read is raised rather
+        # than leaving an empty sheet that the mirror would copy back.
+        if self.seed_from is None or sheet_name in self._seeded:
+            return
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM seeded_sheets WHERE sheet = ?", (sheet_name,)).fetchone()
+        if not done:
+            table = Table() if replacing else normalize_table(self.seed_from.load(sheet_name))
+            with self._lock, self._conn:
+                if not self._columns(sheet_name) and not table.empty:
+                    self._set_columns(sheet_name, table.columns)
+                    self._insert_rows(sheet_name, table.rows)
+                self._conn.execute("INSERT OR IGNORE INTO seeded_sheets (sheet) VALUES (?)", (sheet_name,))
+        self._seeded.add(sheet_name)
+
+    def load(self, sheet_name: str) -> Table:
+        self._seed(sheet_name)
+        with self._lock:
+            columns = self._columns(sheet_name)
+            cur = self._conn.execute("SELECT data FROM sheet_rows WHERE sheet = ? ORDER BY row_id", (sheet_name,))
+            records = [json.loads(data) for (data,) in cur]
+        if not records:
+            return Table()
+        return normalize_table(Table(records, columns or None))
+
+    def save(self, table: Table, sheet_name: str):
+        self._seed(sheet_name, replacing=True)
+        table = normalize_table(table)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sheet_rows WHERE sheet = ?", (sheet_name,))
+            self._conn.execute("DELETE FROM row_slots WHERE sheet = ?", (sheet_name,))
+            self._set_columns(sheet_name, table.columns)
+            self._insert_rows(sheet_name, table.rows)
+        self._written(sheet_name)
+
+    def append(self, table: Table, sheet_name: str):
+        self._seed(sheet_name)
+        table = normalize_table(table)
+        with self._lock, self._conn:
+            columns = self._columns(sheet_name)
+            if not columns:
+                self._set_columns(sheet_name, table.columns)
+            self._insert_rows(sheet_name, table.rows)
+        self._written(sheet_name)
+
+    def upsert(self, row: dict, sheet_name: str) -> bool:
+        return self.upsert_many([row], sheet_name)[0]
+
+    def upsert_many(self, rows, sheet_name: str):
+        self._seed(sheet_name)
+        key = KEY_COLUMNS[sheet_name]
+        existed = []
+        with self._lock, self._conn:
+            columns = self._columns(sheet_name)
+            missing = []
+            for row in rows:
+                missing += [column for column in row if column not in columns and column not in missing]
+            if missing:
+                self._set_columns(sheet_name, columns + missing)
+            for row in rows:
+                name = str(row[key])
+                payload = json.dumps(row, ensure_ascii=False)
+                cur = self._conn.execute(
+                    "UPDATE sheet_rows SET data = ? WHERE sheet = ? AND name = ?", (payload, sheet_name, name)
+                )
+                existed.append(cur.rowcount > 0)
+                if not existed[-1]:
+                    self._conn.execute(
+                        "INSERT INTO sheet_rows (sheet, name, data) VALUES (?, ?, ?)", (sheet_name, name, payload)
+                    )
+                self._index_slots(sheet_name, name, row)
+        self._written(sheet_name, [row[key] for row in rows])
+        return existed
+
+    def slot_postings(self, sheet_name: str):
+        self._seed(sheet_name)
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT slot, name FROM row_slots WHERE sheet = ? ORDER BY slot", (sheet_name,)
+            )
+            postings = {}
+            for slot, name in cur:
+                postings.setdefault(slot, []).append(name)
+            return postings
+
+    def known_key(self, sheet_name: str, name) -> bool:
+        self._seed(sheet_name)
+        with self._lock:
+            cur = self._conn.execute("SELECT 1 FROM sheet_rows WHERE sheet = ? AND name = ?", (sheet_name, str(name)))
+            return cur.fetchone() is not None
+
+
+class SheetsMirror:
+    # Copies SQLite writes to the spreadsheet in the background, for staff
+    # who keep working from the Sheets view. Upserted keys are copied with
+    # upsert_many so rows the database has not seen are left alone; only a
+    # sheet replaced as a whole (save, append) is rewritten.
+    def __init__(self, source: StorageBackend, target: StorageBackend, interval: float):
+        self.source = source
+        self.target = target
+        self.interval = interval
+        self.last_sync = None
+        self.last_error = None
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def mark_dirty(self, sheet_name: str, names=None):
+        # names None: the whole sheet changed.
+        with self._lock:
+            if names is None or (sheet_name in self._dirty and self._dirty[sheet_name] is None):
+                self._dirty[sheet_name] = None
+            else:
+                self._dirty.setdefault(sheet_name, set()).update(names)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        for sheet_name, names in sorted(dirty.items()):
+            try:
+                table = self.source.load(sheet_name)
+                if names is None:
+                    self.target.save(table, sheet_name)
+                else:
+                    key = KEY_COLUMNS[sheet_name]
+                    rows = [row for row in table.rows if row.get(key) in names or str(row.get(key)) in names]
+                    if rows:
+                        self.target.upsert_many(rows, sheet_name)
+            except Exception as e:
+                self.last_error = f"{sheet_name}: {e}"
+                self.mark_dirty(sheet_name, names)
+        self.last_sync = time.time()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="sheets-mirror", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while not self._wake.wait(self.interval):
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = {sheet_name: None if names is None else len(names) for sheet_name, names in self._dirty.items()}
+        return {"interval": self.interval, "pending": pending, "last_sync": self.last_sync, "last_error": self.last_error}
+
+
+def create_storage(kind: str):
+    if kind == "memory":
+        return MemoryBackend(), None
+    if kind == "sqlite":
+        interval = float(os.environ.get("SHEETS_SYNC_INTERVAL", "0"))
+        mirror = None
+        backend = SQLiteBackend(os.environ.get("SQLITE_PATH", "/tmp/scheduling_app.db"))
+        if interval > 0:
+            sheets = SheetsBackend(cache_ttl=0)
+            mirror = SheetsMirror(backend, sheets, interval)
+            backend.on_write = mirror.mark_dirty
+            backend.seed_from = sheets
+            mirror.start()
+        return backend, mirror
+    if kind == "sheets":
+        return SheetsBackend(cache_ttl=float(os.environ.get("SHEET_CACHE_TTL", "15"))), None
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,177 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from api.records import Table
+from api.sheets_client import backoff_delay
+from api.storage import KEY_COLUMNS, normalize_table
+
+CLOSE_RETRIES = int(os.environ.get("SUBMISSION_CLOSE_RETRIES", "3"))
+
+
+class SubmissionQueue:
+    # Buffers keyed form submissions and writes them to storage in batches,
+    # either every flush_interval seconds or as soon as max_rows are waiting.
+    # A later submission for the same name replaces the queued one. With
+    # flush_interval <= 0 every submission is written immediately.
+    # Rows still unwritten when the queue closes are kept in journal_path and
+    # queued again by the next process that opens the same journal.
+    def __init__(self, storage, flush_interval: float, max_rows: int, journal_path=None):
+        self.storage = storage
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+        self.last_error = None
+        self._pending = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._journaled = False
+        self._replay()
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def submit(self, row: dict, sheet_name: str) -> bool:
+        key = KEY_COLUMNS[sheet_name]
+        if not self.enabled or self._closed:
+            with self._lock:
+                # a replayed row must not overwrite this newer one later
+                self._pending.get(sheet_name, {}).pop(row[key], None)
+            return self.storage.upsert(row, sheet_name)
+
+        with self._lock:
+            pending = self._pending.setdefault(sheet_name, {})
+            existed = row[key] in pending or row[key] in self._inflight.get(sheet_name, {})
+            pending[row[key]] = row
+            size = sum(len(rows) for rows in self._pending.values())
+        self._start()
+        if size >= self.max_rows:
+            self._wake.set()
+        # only what the backend already knows: the row is queued either way,
+        # so a slow or failing read must not turn this into an error
+        return existed or self.storage.known_key(sheet_name, row[key])
+
+    def overlay(self, sheet_name: str, table: Table) -> Table:
+        key = KEY_COLUMNS.get(sheet_name)
+        if key is None:
+            return table
+        with self._lock:
+            rows = dict(self._inflight.get(sheet_name, {}))
+            rows.update(self._pending.get(sheet_name, {}))
+        if not rows:
+            return table
+        return normalize_table(table.upserted(key, rows.values()))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            for sheet_name, rows in batch.items():
+                try:
+                    self.storage.upsert_many(list(rows.values()), sheet_name)
+                    self.flushed_rows += len(rows)
+                    self.flushed_batches += 1
+                except Exception as e:
+                    self.last_error = f"{sheet_name}: {e}"
+                    with self._lock:
+                        pending = self._pending.setdefault(sheet_name, {})
+                        for name, row in rows.items():
+                            pending.setdefault(name, row)
+            with self._lock:
+                self._inflight = {}
+                done = not self._pending
+            if done and self._journaled:
+                self._remove_journal()
+
+    def close(self):
+        # Retries with backoff before giving up on storage; whatever is still
+        # pending then goes to the journal rather than being dropped.
+        self._closed = True
+        self._wake.set()
+        for attempt in range(CLOSE_RETRIES + 1):
+            self.flush()
+            with self._lock:
+                pending = {name: dict(rows) for name, rows in self._pending.items() if rows}
+            if not pending:
+                return
+            if attempt < CLOSE_RETRIES:
+                time.sleep(backoff_delay(attempt))
+        self._write_journal(pending)
+
+    def _write_journal(self, pending: dict):
+        if not self.journal_path:
+            return
+        tmp = f"{self.journal_path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(pending, f, ensure_ascii=False)
+            os.replace(tmp, self.journal_path)
+            self._journaled = True
+        except OSError as e:
+            self.last_error = f"journal: {e}"
+
+    def _replay(self):
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                journal = json.load(f)
+        except (OSError, ValueError) as e:
+            self.last_error = f"journal: {e}"
+            return
+        for sheet_name, rows in journal.items():
+            if sheet_name in KEY_COLUMNS and rows:
+                self._pending.setdefault(sheet_name, {}).update(rows)
+        self._journaled = True
+        if self.enabled and self._pending:
+            self._start()
+
+    def _remove_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.last_error = f"journal: {e}"
+            return
+        self._journaled = False
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="submission-queue", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(rows) for rows in self._pending.values())
+        return {
+            "enabled": self.enabled,
+            "flush_interval": self.flush_interval,
+            "max_rows": self.max_rows,
+            "pending": pending,
+            "flushed_rows": self.flushed_rows,
+            "flushed_batches": self.flushed_batches,
+            "journaled": self._journaled,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,97 @@
+import math
+import random
+
+from api.records import Mentor, Student
+
+GRADE_WEIGHTS = {"中1": 1, "中2": 1, "中3": 2, "高1": 3, "高2": 4, "高3": 5}
+SCHOOLS = ["北高校", "南高校", "東高校", "西高校", "中央学園", "青葉学院", "若葉中学"]
+STUDENT_STREAM_WEIGHTS = {"文系": 50, "理系": 35, "未定": 15}
+MENTOR_STREAM_WEIGHTS = {"理系": 50, "文系": 30, "文系,理系": 20}
+# Number of slots a student ticks, and how many separate runs they come in.
+STUDENT_SLOT_WEIGHTS = {1: 8, 2: 20, 3: 25, 4: 18, 5: 12, 6: 8, 7: 5, 8: 4}
+MENTOR_SLOTS = (6, 16)
+
+
+def weekend_days(timetable):
+    # Days with the longest opening hours are the weekend/holiday block.
+    per_day = {day: 0 for day in timetable.days}
+    for day_id in timetable.catalog.day_index:
+        per_day[timetable.catalog.days[day_id]] += 1
+    longest = max(per_day.values(), default=0)
+    if min(per_day.values(), default=0) == longest:
+        return set()
+    return {day for day, count in per_day.items() if count == longest}
+
+
+def _pick(rng, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class CohortGenerator:
+    def __init__(self, timetable, seed=0, weekend_share=0.65, students_per_mentor=10, weekend=None):
+        self.timetable = timetable
+        self.rng = random.Random(seed)
+        self.weekend_share = weekend_share
+        self.students_per_mentor = students_per_mentor
+        catalog = timetable.catalog
+        weekend = set(weekend) if weekend is not None else weekend_days(timetable)
+        self.day_slots = {}
+        for slot_id, day_id in enumerate(catalog.day_index):
+            self.day_slots.setdefault(catalog.days[day_id], []).append(slot_id)
+        self.weekend = [day for day in self.day_slots if day in weekend]
+        self.weekdays = [day for day in self.day_slots if day not in weekend]
+
+    def _day(self):
+        if self.weekend and (not self.weekdays or self.rng.random() < self.weekend_share):
+            return self.rng.choice(self.weekend)
+        return self.rng.choice(self.weekdays)
+
+    def student_slots(self):
+        # Demand comes in runs of consecutive hours on one or two days, with
+        # weekend afternoons the most popular.
+        wanted = _pick(self.rng, STUDENT_SLOT_WEIGHTS)
+        chosen = set()
+        for _ in range(1 if wanted <= 3 else 2):
+            slots = self.day_slots[self._day()]
+            length = min(len(slots), max(1, wanted - len(chosen)))
+            centre = min(len(slots) - 1, int(abs(self.rng.gauss(0.55, 0.25)) * len(slots)))
+            start = max(0, min(len(slots) - length, centre - length // 2))
+            chosen.update(slots[start:start + length])
+            if len(chosen) >= wanted:
+                break
+        return [self.timetable.labels[slot_id] for slot_id in sorted(chosen)]
+
+    def mentor_slots(self):
+        catalog = self.timetable.catalog
+        weights = [1.5 if catalog.days[day_id] in self.weekend else 1.0 for day_id in catalog.day_index]
+        wanted = min(catalog.size, self.rng.randint(*MENTOR_SLOTS))
+        chosen = set()
+        while len(chosen) < wanted:
+            chosen.update(self.rng.choices(range(catalog.size), weights=weights, k=wanted - len(chosen)))
+        return [self.timetable.labels[slot_id] for slot_id in sorted(chosen)]
+
+    def students(self, count: int):
+        return [
+            Student(
+                f"生徒{i:05d}",
+                f"line{i:05d}",
+                self.rng.choice(SCHOOLS),
+                _pick(self.rng, GRADE_WEIGHTS),
+                _pick(self.rng, STUDENT_STREAM_WEIGHTS),
+                "",
+                "",
+                ",".join(self.student_slots()),
+            )
+            for i in range(count)
+        ]
+
+    def mentors(self, count: int):
+        return [
+            Mentor(f"メンター{i:04d}", _pick(self.rng, MENTOR_STREAM_WEIGHTS), ",".join(self.mentor_slots()), "pw")
+            for i in range(count)
+        ]
+
+    def cohort(self, students: int, mentors=None):
+        if mentors is None:
+            mentors = max(1, math.ceil(students / self.students_per_mentor))
+        return self.students(students), self.mentors(mentors)
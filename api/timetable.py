@@ -0,0 +1,203 @@
+import json
+import os
+from datetime import date, timedelta
+
+from api.slots import SlotCatalog
+
+# Calendar definition: blocks of days sharing the same daily hours. Days are
+# listed explicitly ("days": ["6/29", "2026-06-30", ...]) or generated from an
+# ISO date range ("from", "to") optionally filtered by "weekdays" (0 = Monday).
+# An optional top-level "year" is the year the calendar starts in; it may run
+# over New Year but not span more than a year.
+DEFAULT_CALENDAR = {
+    "slot_minutes": 60,
+    "blocks": [
+        {"title": "平日", "days": ["6/29", "6/30", "7/1", "7/2", "7/3"], "start": "19:00", "end": "23:00"},
+        {"title": "土日祝", "days": ["7/4", "7/5"], "start": "10:00", "end": "23:00"},
+    ],
+}
+GRID_MAX_DAYS = 7
+UNKNOWN_SORT_KEY = (99999, 99999)
+
+
+def parse_minutes(value: str) -> int:
+    hours, _, minutes = str(value).partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def format_minutes(total: int) -> str:
+    return f"{total // 60}:{total % 60:02d}"
+
+
+def day_label(day: date) -> str:
+    return f"{day.month}/{day.day}"
+
+
+def month_day(value: str):
+    month, _, day_of_month = str(value).strip().partition("/")
+    return int(month), int(day_of_month)
+
+
+def is_iso(value) -> bool:
+    return "-" in str(value)
+
+
+def calendar_resolver(definition: dict):
+    # "M/D" days carry no year. Next to ISO dates they take the year closest
+    # to those; otherwise the calendar starts after the longest gap between
+    # listed days, so neither block order nor a run over New Year (["12/30",
+    # "12/31", "1/1"]) puts a day in the wrong year. "year" (default: this
+    # year) is the year the calendar starts in.
+    fixed = []
+    listed = set()
+    for block in definition["blocks"]:
+        if "days" in block:
+            for value in block["days"]:
+                if is_iso(value):
+                    fixed.append(date.fromisoformat(str(value).strip()))
+                else:
+                    listed.add(month_day(value))
+        else:
+            fixed += [date.fromisoformat(block["from"]), date.fromisoformat(block["to"])]
+
+    if fixed:
+        first, last = min(fixed), max(fixed)
+
+        def distance(day):
+            return max((first - day).days, (day - last).days, 0)
+
+        def resolve(month, day_of_month):
+            years = range(first.year - 1, last.year + 2)
+            return min((date(year, month, day_of_month) for year in years), key=distance)
+
+        return resolve
+
+    year = int(definition.get("year", date.today().year))
+    ordered = sorted(listed)
+    start = ordered[0] if ordered else (1, 1)
+    if len(ordered) > 1:
+        # leap year, so that 2/29 has a day number
+        numbers = [date(2000, month, day_of_month).toordinal() for month, day_of_month in ordered]
+        gaps = [(numbers[i] - numbers[i - 1]) % 366 for i in range(len(numbers))]
+        start = ordered[gaps.index(max(gaps))]
+
+    def resolve(month, day_of_month):
+        return date(year + ((month, day_of_month) < start), month, day_of_month)
+
+    return resolve
+
+
+def block_days(block: dict, resolve):
+    if "days" in block:
+        return [
+            date.fromisoformat(str(value).strip()) if is_iso(value) else resolve(*month_day(value))
+            for value in block["days"]
+        ]
+    current = date.fromisoformat(block["from"])
+    last = date.fromisoformat(block["to"])
+    weekdays = set(block.get("weekdays", range(7)))
+    days = []
+    while current <= last:
+        if current.weekday() in weekdays:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+class Timetable:
+    def __init__(self, definition: dict):
+        default_minutes = int(definition.get("slot_minutes", 60))
+        resolve = calendar_resolver(definition)
+        spans_by_day = {}
+        grids = []
+        for block in definition["blocks"]:
+            minutes = int(block.get("slot_minutes", default_minutes))
+            start, end = parse_minutes(block["start"]), parse_minutes(block["end"])
+            spans = [(t, t + minutes) for t in range(start, end - minutes + 1, minutes)]
+            dates = block_days(block, resolve)
+            days = [day_label(day) for day in dates]
+            for day in dates:
+                known = spans_by_day.setdefault(day, [])
+                known += [span for span in spans if span not in known]
+            for offset in range(0, len(days), GRID_MAX_DAYS):
+                grids.append((block.get("title", ""), days[offset:offset + GRID_MAX_DAYS], spans))
+
+        # Days are ordered by their full date so a calendar running over New
+        # Year keeps December before January; labels only carry "M/D".
+        dates = sorted(spans_by_day)
+        self.days = [day_label(day) for day in dates]
+        if len(set(self.days)) != len(self.days):
+            raise ValueError("Slot calendar spans more than a year: day labels repeat")
+        labels = []
+        sort_keys = []
+        for position, day in enumerate(dates):
+            for start, end in sorted(spans_by_day[day]):
+                labels.append(f"{self.days[position]} {format_minutes(start)}-{format_minutes(end)}")
+                sort_keys.append((position, start))
+
+        self.labels = labels
+        self.catalog = SlotCatalog(labels)
+        self.ids = self.catalog.ids
+        self.sort_keys = sort_keys
+        self.grids = []
+        self.cell_order = []
+        for title, days, spans in grids:
+            rows = []
+            for start, end in spans:
+                time_label = f"{format_minutes(start)}-{format_minutes(end)}"
+                rows.append((time_label, [self.ids[f"{day} {time_label}"] for day in days]))
+                self.cell_order += rows[-1][1]
+            self.grids.append({
+                "title": title,
+                "days": days,
+                "rows": rows,
+                "start": format_minutes(spans[0][0]) if spans else "",
+                "end": format_minutes(spans[-1][1]) if spans else "",
+            })
+
+    def sort_key(self, label):
+        slot_id = self.ids.get(label) if isinstance(label, str) else None
+        return self.sort_keys[slot_id] if slot_id is not None else UNKNOWN_SORT_KEY
+
+    def slot_ids(self, labels):
+        ids = {self.ids.get(str(label).strip()) for label in labels}
+        ids.discard(None)
+        return sorted(ids)
+
+    def schedule_context(self, prefix: str, selected_labels, marker=None):
+        # With a marker every cell's state is the marker instead, so the grid
+        # can be rendered once and split into static segments (cell_order
+        # lists the slot behind each split point).
+        selected = set(self.slot_ids(selected_labels))
+        grids = []
+        for grid in self.grids:
+            rows = []
+            for time_label, ids in grid["rows"]:
+                cells = [
+                    {
+                        "day": day,
+                        "slot_name": f"{prefix}_slot_{slot_id}",
+                        "slot_value": self.labels[slot_id],
+                        "state": marker if marker is not None else " checked" if slot_id in selected else "",
+                    }
+                    for day, slot_id in zip(grid["days"], ids)
+                ]
+                rows.append({"time": time_label, "cells": cells})
+            grids.append({"title": grid["title"], "days": grid["days"], "rows": rows})
+        return {"schedule_grids": grids}
+
+    def extract_slots(self, form_data, prefix: str):
+        marker = prefix + "_slot_"
+        values = [value for key, value in form_data.items() if key.startswith(marker)]
+        return [self.labels[slot_id] for slot_id in self.slot_ids(values)]
+
+
+def load_timetable() -> Timetable:
+    path = os.environ.get("SLOT_CALENDAR_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return Timetable(json.load(f))
+    inline = os.environ.get("SLOT_CALENDAR")
+    if inline:
+        return Timetable(json.loads(inline))
+    return Timetable(DEFAULT_CALENDAR)
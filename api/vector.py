@@ -0,0 +1,90 @@
+from api.slots import ALL_STREAMS, iter_bits
+from api.startup import lazy_import
+
+UNAVAILABLE = 2 ** 62
+
+
+def match_vectorized(catalog, student_masks, student_streams, mentor_free, mentor_streams, seed=None):
+    # Same preferences as the greedy engine, but the student to place next is
+    # always the one with the fewest remaining (mentor, slot) candidates.
+    # Candidate counts come from one small matrix product up front and are
+    # then decremented column-wise whenever a (mentor, slot) pair is taken.
+    np = lazy_import("numpy")
+    n, m, k = len(student_masks), len(mentor_free), catalog.size
+    assignments = [None] * n
+    if not n or not m:
+        return assignments
+
+    S = np.zeros((n, k), dtype=bool)
+    for s_idx, s_mask in enumerate(student_masks):
+        S[s_idx, list(iter_bits(s_mask))] = True
+    F = np.zeros((m, k), dtype=bool)
+    for m_idx, free in enumerate(mentor_free):
+        F[m_idx, list(iter_bits(free))] = True
+
+    # Eligibility only depends on the stream masks, so it is kept per class
+    # (at most 4 x 4) instead of per student x mentor pair.
+    s_classes, s_class = np.unique(np.asarray(student_streams, dtype=np.int64), return_inverse=True)
+    m_classes, m_class = np.unique(np.asarray(mentor_streams, dtype=np.int64), return_inverse=True)
+    s_class = s_class.reshape(-1)
+    m_class = m_class.reshape(-1)
+    C = ((s_classes[:, None] & m_classes[None, :]) != 0) | (s_classes[:, None] == ALL_STREAMS)
+    # free[c, s] = mentors of stream class c free at slot s
+    free = np.zeros((len(m_classes), k), dtype=np.int64)
+    np.add.at(free, m_class, F)
+    # counts[i] = sum over slots s of S[i, s] * #{eligible mentors free at s}
+    counts = (S * (C.astype(np.int64) @ free)[s_class]).sum(axis=1)
+    pending = counts > 0
+    counts[~pending] = UNAVAILABLE
+    # row-major copy so the per-assignment column lookups are contiguous
+    slot_students = np.ascontiguousarray(S.T)
+    # students each mentor class can serve, and mentors each student class can use
+    class_students = C.T[:, s_class]
+    class_mentors = C[:, m_class]
+
+    day_index = np.asarray(catalog.day_index, dtype=np.int64)
+    assigned_any = np.zeros(m, dtype=bool)
+    assigned_days = np.zeros((m, len(catalog.days)), dtype=np.int32)
+    adjacent = np.zeros((m, k), dtype=np.int32)
+    rng = np.random.default_rng(seed)
+
+    def take(s_idx, m_idx, slot_id):
+        F[m_idx, slot_id] = False
+        assigned_any[m_idx] = True
+        assigned_days[m_idx, day_index[slot_id]] += 1
+        adjacent[m_idx, list(catalog.neighbours[slot_id])] += 1
+        assignments[s_idx] = (m_idx, slot_id)
+
+    for _ in range(n):
+        s_idx = int(counts.argmin())
+        if counts[s_idx] >= UNAVAILABLE:
+            break
+        counts[s_idx] = UNAVAILABLE
+        pending[s_idx] = False
+
+        slots = np.flatnonzero(S[s_idx])
+        js, cols = np.nonzero(F[:, slots] & class_mentors[s_class[s_idx]][:, None])
+        ss = slots[cols]
+        same_day = assigned_days[js, day_index[ss]] > 0
+        score = np.where(same_day, np.where(adjacent[js, ss] > 0, 100, 0), np.where(assigned_any[js], 10, 0))
+        key = assigned_any[js] * 1000 - score - rng.random(len(js))
+        best = int(key.argmin())
+        m_idx, slot_id = int(js[best]), int(ss[best])
+        take(s_idx, m_idx, slot_id)
+
+        # every unplaced student who could have used this pair loses it
+        affected = np.flatnonzero(slot_students[slot_id] & class_students[m_class[m_idx]] & pending)
+        counts[affected] -= 1
+        exhausted = affected[counts[affected] == 0]
+        counts[exhausted] = UNAVAILABLE
+        pending[exhausted] = False
+
+    # Students left without a same-stream candidate get any free mentor at
+    # their first open slot, as in the greedy engine.
+    remaining = [s_idx for s_idx in range(n) if assignments[s_idx] is None]
+    remaining.sort(key=lambda s_idx: int(S[s_idx].sum()))
+    for s_idx in remaining:
+        for slot_id in np.flatnonzero(S[s_idx] & F.any(axis=0)):
+            take(s_idx, int(F[:, slot_id].argmax()), int(slot_id))
+            break
+    return assignments
@@ -5,6 +5,9 @@ from oauth2client.service_account import ServiceAccountCredentials
 import time
 import random
 
+from api.slots import FreeMentorIndex, iter_bits, stream_mask
+from api.timetable import load_timetable
+
 # ==========================================
 # 🛡️ 1. 基本設定・検索除け
 # ==========================================
@@ -24,84 +27,39 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 # ==========================================
 # 📅 2. 時間枠設定 & ソート用ロジック
 # ==========================================
-DAYS_WEEKDAY = ["6/29", "6/30", "7/1", "7/2", "7/3"]
-HOURS_WEEKDAY = range(19, 23)
-
-DAYS_WEEKEND = ["7/4", "7/5"]
-HOURS_WEEKEND = range(10, 23)
-
-ALL_DAYS_ORDER = DAYS_WEEKDAY + DAYS_WEEKEND
-
-TIME_SLOTS = []
-for d in DAYS_WEEKDAY:
-    for h in HOURS_WEEKDAY:
-        TIME_SLOTS.append(f"{d} {h}:00-{h+1}:00")
-for d in DAYS_WEEKEND:
-    for h in HOURS_WEEKEND:
-        TIME_SLOTS.append(f"{d} {h}:00-{h+1}:00")
+TIMETABLE = load_timetable()
+TIME_SLOTS = TIMETABLE.labels
+SLOT_CATALOG = TIMETABLE.catalog
 
 
 def get_sort_key(val):
-    if not val or pd.isna(val) or not isinstance(val, str):
-        return (99, 99)
-    try:
-        parts = val.split(" ")
-        if len(parts) < 2:
-            return (99, 99)
-        date_part, time_part = parts[0], parts[1]
-        d_index = ALL_DAYS_ORDER.index(date_part) if date_part in ALL_DAYS_ORDER else 99
-        h_num = int(time_part.split(":")[0])
-        return (d_index, h_num)
-    except Exception:
-        return (99, 99)
+    return TIMETABLE.sort_key(val)
 
 
 def render_schedule_grid(default_selected=[], key_suffix=""):
     st.write("▼ 以下の表で、可能な日時にチェック ✅ を入れてください")
 
-    st.markdown("**📅 平日 (19:00 〜 23:00)**")
-    times_wd = [f"{h}:00-{h+1}:00" for h in HOURS_WEEKDAY]
-    df_wd = pd.DataFrame(False, index=times_wd, columns=DAYS_WEEKDAY)
-
-    times_we = [f"{h}:00-{h+1}:00" for h in HOURS_WEEKEND]
-    df_we = pd.DataFrame(False, index=times_we, columns=DAYS_WEEKEND)
-
-    for slot_str in default_selected:
-        try:
-            parts = slot_str.split(" ")
-            d, t = parts[0], parts[1]
-            if d in DAYS_WEEKDAY and t in times_wd:
-                df_wd.at[t, d] = True
-            elif d in DAYS_WEEKEND and t in times_we:
-                df_we.at[t, d] = True
-        except Exception:
-            pass
-
-    edited_wd = st.data_editor(
-        df_wd,
-        column_config={day: st.column_config.CheckboxColumn(day, width="small") for day in DAYS_WEEKDAY},
-        use_container_width=True,
-        key=f"grid_wd_{key_suffix}",
-    )
-
-    st.markdown("**📅 土日祝 (10:00 〜 23:00)**")
-    edited_we = st.data_editor(
-        df_we,
-        column_config={day: st.column_config.CheckboxColumn(day, width="small") for day in DAYS_WEEKEND},
-        use_container_width=True,
-        height=500,
-        key=f"grid_we_{key_suffix}",
-    )
-
+    selected_ids = set(TIMETABLE.slot_ids(default_selected))
     selected_slots = []
-    for t in edited_wd.index:
-        for d in edited_wd.columns:
-            if edited_wd.at[t, d]:
-                selected_slots.append(f"{d} {t}")
-    for t in edited_we.index:
-        for d in edited_we.columns:
-            if edited_we.at[t, d]:
-                selected_slots.append(f"{d} {t}")
+    for g_idx, grid in enumerate(TIMETABLE.grids):
+        times = [time_label for time_label, _ in grid["rows"]]
+        st.markdown(f"**📅 {grid['title']} ({grid['start']} 〜 {grid['end']})**")
+        df_grid = pd.DataFrame(
+            [[slot_id in selected_ids for slot_id in ids] for _, ids in grid["rows"]],
+            index=times,
+            columns=grid["days"],
+        )
+        edited = st.data_editor(
+            df_grid,
+            column_config={day: st.column_config.CheckboxColumn(day, width="small") for day in grid["days"]},
+            use_container_width=True,
+            key=f"grid_{g_idx}_{key_suffix}",
+            **({"height": 500} if len(times) > 10 else {}),
+        )
+        for r_idx, (_, ids) in enumerate(grid["rows"]):
+            for c_idx, slot_id in enumerate(ids):
+                if edited.iat[r_idx, c_idx]:
+                    selected_slots.append(TIMETABLE.labels[slot_id])
 
     return selected_slots
 
@@ -182,50 +140,47 @@ def set_status(is_open):
 # ==========================================
 def run_matching(df_st, df_mt, fixed_pairs_df):
     results = []
-    mentor_schedule = {}
-    mentor_streams = {}
-    mentor_assignments = {}
-    mentor_names_list = list(df_mt["メンター氏名"])
-
-    def is_unmatched(m_name):
-        return len(mentor_assignments[m_name]) == 0
+    mentor_names_list = []
+    mentor_index = {}
+    mentor_free = []
+    mentor_assigned = []
+    free_index = FreeMentorIndex(SLOT_CATALOG.size)
 
     for _, row in df_mt.iterrows():
         m_name = row["メンター氏名"]
-        mentor_schedule[m_name] = set(row["可能日時"].split(",")) if row["可能日時"] else set()
-        mentor_assignments[m_name] = set()
-        mentor_streams[m_name] = row["文理"].split(",") if row["文理"] else []
+        mentor_index[m_name] = len(mentor_names_list)
+        mentor_names_list.append(m_name)
+        mentor_free.append(SLOT_CATALOG.mask_of_cell(row["可能日時"]))
+        free_index.add(mentor_index[m_name], mentor_free[-1], stream_mask(row["文理"]))
+        mentor_assigned.append(0)
 
     students_list = []
     for _, s_row in df_st.iterrows():
         s_slots = s_row["可能日時"].split(",") if s_row["可能日時"] else []
         students_list.append({
             "data": s_row,
-            "s_slots_set": set([s.strip() for s in s_slots]),
+            "s_slots_mask": SLOT_CATALOG.mask_of(s_slots),
             "num_slots": len(s_slots),
         })
     students_list.sort(key=lambda x: x["num_slots"])
     processed_students = set()
 
-    def calculate_shift_score(m_name, target_slot):
+    def calculate_shift_score(m_idx, slot_id):
         score = 0
-        assigned = mentor_assignments[m_name]
-        current_day = target_slot.split(" ")[0]
-        day_shifts = [s for s in assigned if s.startswith(current_day)]
-        if not day_shifts:
-            if assigned:
-                score += 10
-        else:
-            idx = TIME_SLOTS.index(target_slot) if target_slot in TIME_SLOTS else -1
-            if idx != -1:
-                adj = [
-                    TIME_SLOTS[idx - 1] if idx > 0 else "",
-                    TIME_SLOTS[idx + 1] if idx < len(TIME_SLOTS) - 1 else "",
-                ]
-                if any(a in assigned for a in adj):
-                    score += 100
+        assigned = mentor_assigned[m_idx]
+        if assigned & SLOT_CATALOG.day_masks[slot_id]:
+            if assigned & SLOT_CATALOG.adjacent_masks[slot_id]:
+                score += 100
+        elif assigned:
+            score += 10
         return score + random.random()
 
+    def assign(m_idx, slot_id):
+        bit = 1 << slot_id
+        mentor_free[m_idx] &= ~bit
+        mentor_assigned[m_idx] |= bit
+        free_index.remove(m_idx, slot_id)
+
     # --- PHASE 0: 指名固定 ---
     for _, pair in fixed_pairs_df.iterrows():
         f_s = pair.get("生徒氏名")
@@ -235,18 +190,18 @@ def run_matching(df_st, df_mt, fixed_pairs_df):
         s_obj = next((x for x in students_list if x["data"]["生徒氏名"] == f_s), None)
         if not s_obj:
             continue
-        common = list(s_obj["s_slots_set"] & mentor_schedule.get(f_m, set()))
+        m_idx = mentor_index.get(f_m)
+        if m_idx is None:
+            continue
+        common = s_obj["s_slots_mask"] & mentor_free[m_idx]
         if not common:
             continue
-        common.sort(key=lambda s: calculate_shift_score(f_m, s), reverse=True)
-        assigned_slot = common[0]
-        if assigned_slot in mentor_schedule[f_m]:
-            mentor_schedule[f_m].remove(assigned_slot)
-        mentor_assignments[f_m].add(assigned_slot)
+        assigned_slot = max(iter_bits(common), key=lambda s: calculate_shift_score(m_idx, s))
+        assign(m_idx, assigned_slot)
         results.append({
             "生徒氏名": f_s,
             "決定メンター": f_m,
-            "決定日時": assigned_slot,
+            "決定日時": SLOT_CATALOG.labels[assigned_slot],
             "ステータス": "決定(指名)",
             "学校": s_obj["data"]["学校"],
             "学年": s_obj["data"]["学年"],
@@ -262,43 +217,37 @@ def run_matching(df_st, df_mt, fixed_pairs_df):
             continue
 
         s_stream = s_row["文理"]
-        s_slots = s_obj["s_slots_set"]
+        s_mask = s_obj["s_slots_mask"]
+        s_stream_mask = stream_mask(s_stream)
         assigned_mentor, assigned_slot = None, None
 
         # 文理一致優先
         candidates = []
-        for slot in s_slots:
-            for m_name in mentor_names_list:
-                if slot in mentor_schedule[m_name]:
-                    if s_stream == "未定" or s_stream in mentor_streams.get(m_name, []):
-                        candidates.append((m_name, slot))
+        for slot_id in iter_bits(s_mask):
+            for m_idx in free_index.candidates(slot_id, s_stream_mask):
+                candidates.append((m_idx, slot_id))
 
         if candidates:
-            candidates.sort(
+            assigned_mentor, assigned_slot = min(
+                candidates,
                 key=lambda x: (
-                    0 if is_unmatched(x[0]) else 1,
+                    1 if mentor_assigned[x[0]] else 0,
                     -calculate_shift_score(x[0], x[1])
                 )
             )
-            assigned_mentor, assigned_slot = candidates[0]
         else:
             # 文理無視
-            for slot in s_slots:
-                for m_name in mentor_names_list:
-                    if slot in mentor_schedule[m_name]:
-                        assigned_mentor, assigned_slot = m_name, slot
-                        break
-                if assigned_mentor:
+            for slot_id in iter_bits(s_mask):
+                if free_index.any[slot_id]:
+                    assigned_mentor, assigned_slot = min(free_index.any[slot_id]), slot_id
                     break
 
-        if assigned_mentor:
-            if assigned_slot in mentor_schedule[assigned_mentor]:
-                mentor_schedule[assigned_mentor].remove(assigned_slot)
-            mentor_assignments[assigned_mentor].add(assigned_slot)
+        if assigned_mentor is not None:
+            assign(assigned_mentor, assigned_slot)
             results.append({
                 "生徒氏名": s_name,
-                "決定メンター": assigned_mentor,
-                "決定日時": assigned_slot,
+                "決定メンター": mentor_names_list[assigned_mentor],
+                "決定日時": SLOT_CATALOG.labels[assigned_slot],
                 "ステータス": "決定",
                 "学校": s_row["学校"],
                 "学年": s_row["学年"],
@@ -0,0 +1,139 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import api.index  # noqa: E402
+from api.engines import ENGINES  # noqa: E402
+from api.slots import ALL_STREAMS, stream_mask  # noqa: E402
+from api.synthetic import CohortGenerator  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "matching_baseline.json"
+# Differences below these floors are treated as noise.
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+
+def quality(results, mentors):
+    catalog = api.index.SLOT_CATALOG
+    streams = {mentor.name: stream_mask(mentor.stream) for mentor in mentors}
+    matched = [result for result in results if result.mentor]
+    same_stream = 0
+    days = {}
+    for result in matched:
+        student_stream = stream_mask(result.student.stream)
+        if student_stream == ALL_STREAMS or student_stream & streams[result.mentor]:
+            same_stream += 1
+        days.setdefault(result.mentor, set()).add(catalog.days[catalog.day_index[catalog.ids[result.slot]]])
+    return {
+        "matched": len(matched),
+        "match_rate": round(len(matched) / len(results), 4) if results else 0.0,
+        "stream_rate": round(same_stream / len(matched), 4) if matched else 0.0,
+        "mentor_days": sum(len(d) for d in days.values()),
+    }
+
+
+def run_case(students, mentors, engine: str, repeat: int, seed: int, measure_memory: bool):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = api.index.run_matching(students, mentors, engine, seed=seed)
+        timings.append(time.perf_counter() - started)
+    case = {"seconds": round(min(timings), 4), **quality(results, mentors)}
+    if measure_memory:
+        # separate run: tracing allocations slows the matcher down
+        tracemalloc.start()
+        api.index.run_matching(students, mentors, engine, seed=seed)
+        case["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    return case
+
+
+def regressions(case, base, args):
+    found = []
+    if case["seconds"] > base["seconds"] * (1 + args.time_tolerance) and case["seconds"] - base["seconds"] > MIN_SECONDS:
+        found.append(f"time {base['seconds']:.3f}s -> {case['seconds']:.3f}s")
+    if "peak_mb" in case and "peak_mb" in base:
+        if case["peak_mb"] > base["peak_mb"] * (1 + args.memory_tolerance) and case["peak_mb"] - base["peak_mb"] > MIN_PEAK_MB:
+            found.append(f"peak memory {base['peak_mb']:.1f}MB -> {case['peak_mb']:.1f}MB")
+    for key in ("match_rate", "stream_rate"):
+        if case[key] < base[key] - args.quality_tolerance:
+            found.append(f"{key} {base[key]:.4f} -> {case[key]:.4f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the matching engines on synthetic cohorts and compare with a JSON baseline.")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated student counts, e.g. 100,1000,10000,50000")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; the fastest is recorded")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--quality-tolerance", type=float, default=0.005)
+    args = parser.parse_args()
+
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")).get("cases", {})
+
+    # first calls pay for lazy imports (numpy, ...), keep them out of the timings
+    warmup_students, warmup_mentors = CohortGenerator(api.index.TIMETABLE, seed=args.seed).cohort(20)
+    for engine in engines:
+        api.index.run_matching(warmup_students, warmup_mentors, engine, seed=args.seed)
+
+    cases = {}
+    failed = []
+    print(f"{'case':<16}{'seconds':>9}{'peak MB':>9}{'matched':>9}{'rate':>8}{'stream':>8}{'days':>8}")
+    for size in sizes:
+        students, mentors = CohortGenerator(api.index.TIMETABLE, seed=args.seed).cohort(size)
+        for engine in engines:
+            name = f"{engine}/{size}"
+            case = run_case(students, mentors, engine, args.repeat, args.seed, not args.no_memory)
+            case["mentors"] = len(mentors)
+            cases[name] = case
+            print(
+                f"{name:<16}{case['seconds']:>9.3f}{case.get('peak_mb', float('nan')):>9.1f}{case['matched']:>9}"
+                f"{case['match_rate']:>8.3f}{case['stream_rate']:>8.3f}{case['mentor_days']:>8}",
+                flush=True,
+            )
+            if name in baseline:
+                for problem in regressions(case, baseline[name], args):
+                    failed.append(f"{name}: {problem}")
+
+    if args.update or not baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        merged = {**baseline, **cases}
+        document = {
+            "meta": {"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed},
+            "cases": dict(sorted(merged.items())),
+        }
+        args.baseline.write_text(json.dumps(document, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    missing = [name for name in cases if name not in baseline]
+    if missing:
+        print(f"no baseline for: {', '.join(missing)} (run with --update to record)")
+    for problem in failed:
+        print(f"REGRESSION {problem}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import csv
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from api.records import Mentor, Student  # noqa: E402
+from api.synthetic import CohortGenerator  # noqa: E402
+from api.timetable import load_timetable  # noqa: E402
+
+
+def write_csv(path: Path, records, record_type):
+    columns = [column for _, column in record_type.FIELDS]
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(record.to_row() for record in records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic cohort of students and mentors as CSV.")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--mentors", type=int, default=None, help="default: one mentor per --students-per-mentor")
+    parser.add_argument("--students-per-mentor", type=float, default=10)
+    parser.add_argument("--weekend-share", type=float, default=0.65, help="share of student demand on weekend days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("cohort"))
+    args = parser.parse_args()
+
+    generator = CohortGenerator(
+        load_timetable(),
+        seed=args.seed,
+        weekend_share=args.weekend_share,
+        students_per_mentor=args.students_per_mentor,
+    )
+    students, mentors = generator.cohort(args.students, args.mentors)
+    args.out.mkdir(parents=True, exist_ok=True)
+    write_csv(args.out / "students.csv", students, Student)
+    write_csv(args.out / "mentors.csv", mentors, Mentor)
+    print(f"{len(students)} students, {len(mentors)} mentors -> {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import api.index
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "report": api.index.startup_report()}))
+"""
+
+
+def measure(runs: int):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing api/index.py exceeds the cold-start budget.")
+    parser.add_argument("--budget-ms", type=float, default=800)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = measure(args.runs)
+    median_ms = statistics.median(sample["seconds"] for sample in samples) * 1000
+    heavy = sorted({name for sample in samples for name in sample["report"]["heavy_modules_loaded"]})
+    print(f"import api.index: median {median_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    for name, seconds in samples[-1]["report"]["imports"].items():
+        print(f"  {name}: {seconds * 1000:.0f} ms")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+(function () {
+  var root = document.getElementById("admin-tables");
+  if (!root) return;
+  var token = root.dataset.token;
+  var PER_PAGE = 50;
+  var CLIP_LENGTH = 40;
+
+  function setupTable(section) {
+    var table = section.dataset.table;
+    var thead = section.querySelector("thead");
+    var tbody = section.querySelector("tbody");
+    var count = section.querySelector('[data-role="count"]');
+    var more = section.querySelector('[data-role="more"]');
+    var state = { page: 0, pages: 0, sort: "", order: "asc", loading: false, request: 0 };
+
+    function params(page) {
+      var query = new URLSearchParams({ page: page, per_page: PER_PAGE });
+      section.querySelectorAll("[data-filter]").forEach(function (input) {
+        if (input.value) query.set(input.dataset.filter, input.value);
+      });
+      if (state.sort) {
+        query.set("sort", state.sort);
+        query.set("order", state.order);
+      }
+      return query;
+    }
+
+    function renderHeader(columns) {
+      var row = document.createElement("tr");
+      columns.forEach(function (column) {
+        var th = document.createElement("th");
+        th.className = "sortable";
+        th.textContent = column + (state.sort === column ? (state.order === "asc" ? " ▲" : " ▼") : "");
+        th.addEventListener("click", function () {
+          state.order = state.sort === column && state.order === "asc" ? "desc" : "asc";
+          state.sort = column;
+          load(true);
+        });
+        row.appendChild(th);
+      });
+      thead.replaceChildren(row);
+    }
+
+    function renderRows(columns, rows) {
+      rows.forEach(function (record) {
+        var tr = document.createElement("tr");
+        columns.forEach(function (column) {
+          var td = document.createElement("td");
+          var value = record[column] === undefined || record[column] === null ? "" : String(record[column]);
+          if (value.length > CLIP_LENGTH) {
+            td.className = "clipped";
+            td.title = value;
+          }
+          td.textContent = value;
+          tr.appendChild(td);
+        });
+        tbody.appendChild(tr);
+      });
+    }
+
+    function message(text) {
+      tbody.innerHTML = "";
+      var tr = document.createElement("tr");
+      var td = document.createElement("td");
+      td.colSpan = 100;
+      td.textContent = text;
+      tr.appendChild(td);
+      tbody.appendChild(tr);
+    }
+
+    function load(reset) {
+      if (state.loading && !reset) return;
+      var page = reset ? 1 : state.page + 1;
+      var request = ++state.request;
+      state.loading = true;
+      fetch("/admin/api/" + table + "?" + params(page), { headers: { "X-Admin-Token": token } })
+        .then(function (response) {
+          if (!response.ok) throw new Error(response.status);
+          return response.json();
+        })
+        .then(function (data) {
+          if (request !== state.request) return;
+          if (reset) {
+            tbody.innerHTML = "";
+            renderHeader(data.columns);
+          }
+          state.page = data.page;
+          state.pages = data.pages;
+          count.textContent = "（" + data.total + "件）";
+          if (!data.total) message("データはありません。");
+          renderRows(data.columns, data.rows);
+          more.hidden = state.page >= state.pages;
+        })
+        .catch(function (error) {
+          if (request === state.request) message("エラー: 読み込みに失敗しました（" + error.message + "）");
+        })
+        .finally(function () {
+          if (request === state.request) state.loading = false;
+        });
+    }
+
+    var timer = null;
+    section.querySelectorAll("[data-filter]").forEach(function (input) {
+      input.addEventListener(input.tagName === "SELECT" ? "change" : "input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { load(true); }, input.tagName === "SELECT" ? 0 : 250);
+      });
+    });
+    more.addEventListener("click", function () { load(false); });
+    if ("IntersectionObserver" in window) {
+      new IntersectionObserver(function (entries) {
+        if (entries[0].isIntersecting && !more.hidden) load(false);
+      }).observe(more);
+    }
+    load(true);
+  }
+
+  root.querySelectorAll(".admin-table").forEach(setupTable);
+})();
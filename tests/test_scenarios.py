@@ -0,0 +1,28 @@
+from api.scenarios import BASELINE_NAME, run_scenarios
+from api.slots import SlotCatalog
+
+CATALOG = SlotCatalog(["7/4 10:00-11:00", "7/4 11:00-12:00", "7/5 10:00-11:00"])
+STUDENTS = (["a", "b", "c"], [0b011, 0b001, 0b100], [0, 0, 0])
+MENTORS = (["m1", "m2"], [0b111, 0b001], [0, 0])
+
+
+def run(scenarios, seed=3):
+    return run_scenarios(CATALOG, STUDENTS, MENTORS, scenarios, seed=seed, max_workers=1)
+
+
+def test_baseline_for_each_engine_used():
+    results = run([{"name": "x", "engine": "vector"}, {"name": "y", "close_days": ["7/5"]}])
+    assert [(result["name"], result["engine"]) for result in results] == [
+        (f"{BASELINE_NAME}（vector）", "vector"),
+        (f"{BASELINE_NAME}（greedy）", "greedy"),
+        ("x", "vector"),
+        ("y", "greedy"),
+    ]
+    assert results[3]["unmatched"] == ["c"]
+
+
+def test_every_job_shares_one_seed():
+    assert {result["seed"] for result in run([{"name": "x"}])} == {3}
+    results = run([{"name": "x"}, {"name": "y", "engine": "flow"}], seed=None)
+    assert len({result["seed"] for result in results}) == 1
+    assert results[0]["name"] == f"{BASELINE_NAME}（greedy）"
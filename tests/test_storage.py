@@ -0,0 +1,120 @@
+import pytest
+
+from api.records import Table
+from api.storage import MemoryBackend, SheetsMirror, SQLiteBackend
+
+# The keyed-write semantics every backend shares with SheetsBackend: an upsert
+# replaces the row holding its key in place, new keys go to the end, and
+# columns only ever grow.
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "storage.db"))
+
+
+def student(name, questions="", **extra):
+    return {"生徒氏名": name, "質問内容": questions, **extra}
+
+
+def names(table):
+    return table.column("生徒氏名")
+
+
+def test_missing_sheet_loads_empty(backend):
+    assert backend.load("students").empty
+
+
+def test_upsert_reports_whether_key_existed(backend):
+    assert backend.upsert(student("a", "1"), "students") is False
+    assert backend.upsert(student("a", "2"), "students") is True
+    assert backend.load("students").rows == [student("a", "2")]
+
+
+def test_upsert_replaces_existing_row_in_place(backend):
+    for name in "abc":
+        backend.upsert(student(name, "1"), "students")
+    backend.upsert(student("b", "2"), "students")
+    table = backend.load("students")
+    assert names(table) == ["a", "b", "c"]
+    assert table.find("生徒氏名", "b")["質問内容"] == "2"
+
+
+def test_upsert_replaces_whole_row(backend):
+    backend.upsert(student("a", "1", 学年="高1"), "students")
+    backend.upsert({"生徒氏名": "a", "質問内容": "2"}, "students")
+    assert backend.load("students").rows == [student("a", "2", 学年="")]
+
+
+def test_new_columns_are_appended(backend):
+    backend.upsert(student("a", "1"), "students")
+    backend.upsert(student("b", "1", 学年="高2"), "students")
+    table = backend.load("students")
+    assert table.columns == ["生徒氏名", "質問内容", "学年"]
+    assert table.find("生徒氏名", "a")["学年"] == ""
+
+
+def test_upsert_many_reports_each_row(backend):
+    backend.upsert(student("a", "1"), "students")
+    existed = backend.upsert_many([student("a", "2"), student("b", "1")], "students")
+    assert existed == [True, False]
+    assert names(backend.load("students")) == ["a", "b"]
+
+
+def test_removed_key_comes_back_at_the_end(backend):
+    for name in "abc":
+        backend.upsert(student(name, "1"), "students")
+    backend.save(Table([student("a", "1"), student("c", "1")]), "students")
+    assert backend.upsert(student("b", "2"), "students") is False
+    assert backend.upsert(student("a", "2"), "students") is True
+    assert names(backend.load("students")) == ["a", "c", "b"]
+
+
+def test_clear_then_upsert(backend):
+    backend.upsert(student("a", "1"), "students")
+    backend.save(Table(), "students")
+    assert backend.load("students").empty
+    assert backend.upsert(student("a", "2"), "students") is False
+    assert backend.load("students").rows == [student("a", "2")]
+
+
+def test_sheets_are_independent(backend):
+    backend.upsert(student("a", "1"), "students")
+    backend.upsert({"メンター氏名": "a", "パスワード": 1234}, "mentors")
+    assert names(backend.load("students")) == ["a"]
+    assert backend.load("mentors").rows == [{"メンター氏名": "a", "パスワード": "1234"}]
+
+
+def test_append_keeps_existing_rows(backend):
+    backend.save(Table([student("a", "1")]), "students")
+    backend.append(Table([student("b", "1")]), "students")
+    assert names(backend.load("students")) == ["a", "b"]
+
+
+def test_sqlite_slot_index_follows_writes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "storage.db"))
+    backend.upsert(student("a", 可能日時="7/4 10:00-11:00,7/4 11:00-12:00"), "students")
+    backend.upsert(student("b", 可能日時="7/4 10:00-11:00"), "students")
+    backend.upsert(student("a", 可能日時="7/5 10:00-11:00"), "students")
+    assert backend.slot_postings("students") == {"7/4 10:00-11:00": ["b"], "7/5 10:00-11:00": ["a"]}
+    backend.save(Table([student("c", 可能日時="7/4 10:00-11:00")]), "students")
+    assert backend.slot_postings("students") == {"7/4 10:00-11:00": ["c"]}
+    assert MemoryBackend().slot_postings("students") is None
+
+
+def test_mirror_starts_from_target_and_copies_only_changed_keys(tmp_path):
+    sheets = MemoryBackend()
+    sheets.save(Table([student("existing1", "1"), student("existing2", "1")]), "students")
+    database = SQLiteBackend(str(tmp_path / "storage.db"), seed_from=sheets)
+    mirror = SheetsMirror(database, sheets, interval=60)
+    database.on_write = mirror.mark_dirty
+
+    assert database.upsert(student("existing2", "2"), "students") is True
+    database.upsert(student("new", "1"), "students")
+    sheets.upsert(student("staff", "1"), "students")
+    mirror.flush()
+
+    assert names(sheets.load("students")) == ["existing1", "existing2", "staff", "new"]
+    assert sheets.load("students").find("生徒氏名", "existing2")["質問内容"] == "2"
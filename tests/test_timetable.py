@@ -0,0 +1,44 @@
+import pytest
+
+from api.timetable import DEFAULT_CALENDAR, Timetable
+
+
+def block(days=None, start="19:00", end="21:00", **range_):
+    return {"days": days, "start": start, "end": end} if days else {**range_, "start": start, "end": end}
+
+
+def test_default_calendar_in_order():
+    timetable = Timetable(DEFAULT_CALENDAR)
+    assert timetable.days == ["6/29", "6/30", "7/1", "7/2", "7/3", "7/4", "7/5"]
+
+
+def test_block_order_does_not_change_day_order():
+    blocks = list(reversed(DEFAULT_CALENDAR["blocks"]))
+    timetable = Timetable({"slot_minutes": 60, "blocks": blocks})
+    assert timetable.days == ["6/29", "6/30", "7/1", "7/2", "7/3", "7/4", "7/5"]
+    assert timetable.sort_key("6/29 19:00-20:00") < timetable.sort_key("7/4 10:00-11:00")
+
+
+def test_listed_day_before_a_range():
+    timetable = Timetable({"blocks": [block(**{"from": "2026-07-02", "to": "2026-07-03"}), block(["7/1"])]})
+    assert timetable.days == ["7/1", "7/2", "7/3"]
+
+
+def test_range_over_new_year():
+    timetable = Timetable({"slot_minutes": 30, "blocks": [block(**{"from": "2026-12-20", "to": "2027-01-20"})]})
+    assert timetable.days[0] == "12/20"
+    assert timetable.days[-1] == "1/20"
+    assert timetable.labels[0] == "12/20 19:00-19:30"
+    assert timetable.sort_key("12/31 19:00-19:30") < timetable.sort_key("1/1 19:00-19:30")
+
+
+def test_listed_days_over_new_year_in_separate_blocks():
+    timetable = Timetable({"blocks": [block(["1/1", "1/2"], "10:00", "12:00"), block(["12/30", "12/31"])]})
+    assert timetable.days == ["12/30", "12/31", "1/1", "1/2"]
+    assert timetable.labels[0] == "12/30 19:00-20:00"
+    assert timetable.labels[-1] == "1/2 11:00-12:00"
+
+
+def test_calendar_longer_than_a_year_is_rejected():
+    with pytest.raises(ValueError):
+        Timetable({"blocks": [block(**{"from": "2026-01-01", "to": "2027-01-05"})]})